@@ -0,0 +1,103 @@
+"""
+On-disk cache of complete risk assessment outputs.
+"""
+
+import os
+import time
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+from pydantic_core import to_json
+
+from .models import RiskAssessmentOutput, Trace
+
+logger = logging.getLogger(__name__)
+
+# Bump when the workflow changes in a way that invalidates saved outputs
+WORKFLOW_VERSION = "1"
+CACHE_DIR = ".cache/risk"
+# CVE data changes over time, so outputs are only reused for a day
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+
+class ResponseCache:
+    """
+    Cache of RiskAssessmentOutput keyed by (company, software).
+
+    Entries are JSON files named by a hash of the normalized key, so the
+    cache is shared across CLI invocations and batch workers.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, ttl_seconds: float = CACHE_TTL_SECONDS):
+        """
+        Initialize the response cache.
+
+        Args:
+            cache_dir: Directory holding cached outputs
+            ttl_seconds: Maximum age of a reusable entry
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+
+    @staticmethod
+    def make_key(company_name: str, software_name: str) -> str:
+        """Build the cache key for a (company, software) pair."""
+        normalized = f"{company_name.strip().lower()}|{software_name.strip().lower()}|{WORKFLOW_VERSION}"
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def _path(self, company_name: str, software_name: str) -> Path:
+        return self.cache_dir / f"{self.make_key(company_name, software_name)}.json"
+
+    def get(self, company_name: str, software_name: str) -> Optional[RiskAssessmentOutput]:
+        """
+        Get a cached output if one exists and has not expired.
+
+        Returns:
+            Cached RiskAssessmentOutput with a trailing response_cache trace,
+            or None on a miss
+        """
+        path = self._path(company_name, software_name)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.ttl_seconds:
+                return None
+            output = RiskAssessmentOutput.model_validate_json(path.read_bytes())
+            # Mark the output as reused so saved files show where it came from
+            output.traces.append(Trace(step="response_cache", tool="response_cache",
+                                       cache_hit=True, age_seconds=round(age, 1)))
+            return output
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+            return None
+
+    def set(self, company_name: str, software_name: str, output: RiskAssessmentOutput) -> None:
+        """
+        Store an output, replacing any existing entry atomically.
+
+        Outputs from degraded runs are not stored, so a transient failure is
+        not served as a decision for the rest of the TTL.
+        """
+        if not is_cacheable(output):
+            logger.info("Not caching degraded assessment for %s @ %s", software_name, company_name)
+            return
+        path = self._path(company_name, software_name)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.{id(output)}.tmp")
+            tmp_path.write_bytes(to_json(output))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to cache output for %s @ %s: %s", software_name, company_name, e)
+
+
+def is_cacheable(output: RiskAssessmentOutput) -> bool:
+    """
+    Whether an output came from a clean run and may be reused.
+
+    Any trace recording an error (failed search, NVD error, LLM fallback)
+    makes the output uncacheable.
+    """
+    return not any((trace.model_extra or {}).get("error") for trace in output.traces)
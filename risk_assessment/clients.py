@@ -0,0 +1,51 @@
+"""
+Process-wide factories for external API clients.
+
+Client construction (auth setup, HTTP sessions) is relatively expensive, so
+clients are created lazily and shared by every assessor using the same settings.
+"""
+
+from functools import lru_cache
+from typing import Optional
+from tavily import TavilyClient
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+
+from .cve_client import CVEDatabaseClient
+from .utils import NVDCache, SearchCache
+
+
+@lru_cache(maxsize=4)
+def get_tavily_client(api_key: str) -> TavilyClient:
+    """Get a shared Tavily client for the given API key."""
+    return TavilyClient(api_key=api_key)
+
+
+@lru_cache(maxsize=4)
+def get_search_cache(api_key: str) -> SearchCache:
+    """Get the shared Tavily search cache for the given API key."""
+    return SearchCache(get_tavily_client(api_key))
+
+
+@lru_cache(maxsize=8)
+def get_gemini_llm(model: str, api_key: str, temperature: float) -> ChatGoogleGenerativeAI:
+    """Get a shared Gemini chat model for the given settings."""
+    return ChatGoogleGenerativeAI(
+        model=model,
+        google_api_key=api_key,
+        temperature=temperature
+    )
+
+
+@lru_cache(maxsize=4)
+def get_gemini_embeddings(model: str, api_key: str) -> GoogleGenerativeAIEmbeddings:
+    """Get a shared Gemini embeddings client for the given settings."""
+    return GoogleGenerativeAIEmbeddings(
+        model=model,
+        google_api_key=api_key
+    )
+
+
+@lru_cache(maxsize=4)
+def get_cve_client(api_key: Optional[str] = None) -> CVEDatabaseClient:
+    """Get a shared NVD client (and its memory/disk result cache) for the given API key."""
+    return CVEDatabaseClient(api_key=api_key, disk_cache=NVDCache())
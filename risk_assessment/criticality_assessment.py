@@ -2,30 +2,168 @@
 Business criticality assessment module.
 """
 
+import re
+import json
 import time
+import asyncio
+import string
+import hashlib
 import logging
-from typing import List
-from tavily import TavilyClient
-from langchain_google_genai import ChatGoogleGenerativeAI
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Optional
 
+from .clients import get_search_cache, get_gemini_llm, get_gemini_embeddings
 from .models import CriticalityAssessment, Criticality
+from .semantic_cache import SemanticCache
 from .structured_outputs import CriticalityAnalysisOutput
-from .utils import calculate_cost
+from .utils import calculate_cost, get_token_usage, SearchCache, trace_error
 
 logger = logging.getLogger(__name__)
 
 REASONING_MAX_LENGTH = 500
+SEARCH_MAX_RESULTS = 3
+SEARCH_DEPTH = "basic"
+SEMANTIC_CACHE_THRESHOLD = 0.92
+EMBEDDING_MODEL = "models/text-embedding-004"
+PROMPT_CACHE_MAX_ENTRIES = 128
+CONTENT_MAX_CHARS = 1500  # Per search result
+CONTEXT_MAX_CHARS = 6000  # Per company/software context block
+FINGERPRINT_CHARS = 256  # Prefix length used to detect duplicate sources
+
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_CODE_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+JSON_ONLY_INSTRUCTION = "\nReturn ONLY valid JSON, no markdown formatting."
+
+CRITICALITY_GUIDELINES = """Then determine CRITICALITY LEVEL using these guidelines:
+- HIGH: Critical to core business operations, revenue-generating, or security-critical
+  Examples: IDE @ Software Company, Identity Management @ Bank, Payment Processor @ E-commerce
+- MEDIUM: Important for productivity but not core to business model
+  Examples: Analytics Tool @ Any Company, Project Management @ Tech Company
+- LOW: Nice-to-have, minimal business impact if unavailable
+  Examples: Wallpaper App @ Bank, Entertainment Tool @ Enterprise
+
+EXAMPLES:
+- Okta Workforce Identity @ Citi Bank → HIGH (security-critical, regulatory requirement)
+- IDE @ Software Company → HIGH (core productivity tool for primary business)
+- Analytics Tool @ E-commerce → MEDIUM (helpful insights but not essential)
+
+You must respond with a structured JSON object with these exact fields:
+- company_business: string describing the company's primary business
+- software_purpose: string describing what the software does
+- relevance: string explaining how the software relates to the company's business
+- impact_if_unavailable: string describing impact if software was unavailable
+- criticality_level: one of "low", "medium", or "high"
+- reasoning: 2-3 sentences explaining the criticality level
+- confidence: one of "low", "medium", or "high\""""
+
+# Built once at import; only the per-request slots are substituted per call
+CRITICALITY_PROMPT_TEMPLATE = string.Template("""You are a business analyst assessing software criticality.
+
+COMPANY: ${company_name}
+SOFTWARE: ${software_name}
+
+COMPANY CONTEXT:
+${company_context}
+
+SOFTWARE CONTEXT:
+${software_context}
+
+Analyze the business criticality by thinking through these steps:
+
+1. COMPANY BUSINESS: Describe ${company_name}'s primary business in 1-2 sentences
+2. SOFTWARE PURPOSE: Describe what ${software_name} does in 1-2 sentences  
+3. RELEVANCE: Explain how ${software_name} relates to ${company_name}'s business (1-2 sentences)
+4. IMPACT IF UNAVAILABLE: Describe what would happen if ${software_name} was unavailable (1-2 sentences)
+
+""" + CRITICALITY_GUIDELINES + """
+
+Provide your analysis now.""")
+
+
+@lru_cache(maxsize=PROMPT_CACHE_MAX_ENTRIES)
+def build_criticality_prompt(company_name: str, software_name: str,
+                             company_context: str, software_context: str) -> str:
+    """Render the criticality prompt, reusing it for repeated (retried) inputs."""
+    return CRITICALITY_PROMPT_TEMPLATE.substitute(
+        company_name=company_name,
+        software_name=software_name,
+        company_context=company_context,
+        software_context=software_context
+    )
+
+
+def _parse_analysis(content: str) -> CriticalityAnalysisOutput:
+    """
+    Parse a criticality analysis from an LLM reply.
+    
+    Tries the whole reply (minus code fences) first, then each JSON object
+    embedded in surrounding prose.
+    
+    Raises:
+        ValueError: If no object in the reply is a valid analysis
+    """
+    text = _CODE_FENCE_RE.sub("", content)
+    try:
+        return CriticalityAnalysisOutput.model_validate_json(text)
+    except ValueError:
+        pass
+    
+    decoder = json.JSONDecoder()
+    for start in (i for i, ch in enumerate(text) if ch == "{"):
+        try:
+            obj, _ = decoder.raw_decode(text, start)
+            return CriticalityAnalysisOutput.model_validate(obj)
+        except ValueError:
+            continue
+    raise ValueError("no valid criticality analysis in response")
+
+
+def _software_key(software_name: str) -> str:
+    """Normalize a software name for exact-match semantic cache checks."""
+    return " ".join(software_name.lower().split())
+
+
 class CriticalityAssessor:
     """Assesses business criticality of software for a company."""
     
-    def __init__(self, tavily_api_key: str, google_api_key: str):
-        """Initialize the criticality assessor."""
-        self.tavily_client = TavilyClient(api_key=tavily_api_key)
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
-            google_api_key=google_api_key,
-            temperature=0.3
+    def __init__(self, tavily_api_key: str, google_api_key: str, use_semantic_cache: bool = False,
+                 search_cache: Optional[SearchCache] = None):
+        """
+        Initialize the criticality assessor.
+        
+        Args:
+            tavily_api_key: Tavily API key for web search
+            google_api_key: Google API key for Gemini and embeddings
+            use_semantic_cache: Whether to reuse analyses for near-duplicate
+                company names assessing the same software (opt-in)
+            search_cache: Search cache to share with other assessors
+                (default: the process-wide cache for this API key)
+        """
+        self.search_cache = search_cache or get_search_cache(tavily_api_key)
+        # Temperature 0: deterministic output so cached analyses stay consistent
+        self.llm = get_gemini_llm("gemini-2.0-flash-exp", google_api_key, 0)
+        # Bind structured-output schemas once instead of per request; the raw
+        # message is kept so the fallback call's token usage is still billed
+        self.structured_llm = self.llm.with_structured_output(
+            CriticalityAnalysisOutput,
+            include_raw=True
         )
+        self.semantic_cache = None
+        self.embeddings = None
+        if use_semantic_cache:
+            self.semantic_cache = SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+            self.embeddings = get_gemini_embeddings(EMBEDDING_MODEL, google_api_key)
+    
+    def _cached_search(self, query: str) -> tuple:
+        """
+        Run a Tavily search, serving repeated queries from the search cache.
+        
+        Returns:
+            Tuple of (Tavily response, cache_hit)
+        """
+        return self.search_cache.search(query, SEARCH_MAX_RESULTS, SEARCH_DEPTH)
     
     def search_company_info(self, company_name: str) -> dict:
         """Search for company information."""
@@ -34,18 +172,15 @@ class CriticalityAssessor:
         query = f"{company_name} company business industry products services"
         
         try:
-            results = self.tavily_client.search(
-                query=query,
-                max_results=3,
-                search_depth="basic"
-            )
+            results, cache_hit = self._cached_search(query)
             
             elapsed = time.time() - start_time
             
             return {
                 "results": results.get("results", []),
                 "query": query,
-                "elapsed_time": elapsed
+                "elapsed_time": elapsed,
+                "cache_hit": cache_hit
             }
         except Exception as e:
             logger.error("Error searching company info: %s", e)
@@ -63,18 +198,15 @@ class CriticalityAssessor:
         query = f"{software_name} software tool purpose use case features"
         
         try:
-            results = self.tavily_client.search(
-                query=query,
-                max_results=3,
-                search_depth="basic"
-            )
+            results, cache_hit = self._cached_search(query)
             
             elapsed = time.time() - start_time
             
             return {
                 "results": results.get("results", []),
                 "query": query,
-                "elapsed_time": elapsed
+                "elapsed_time": elapsed,
+                "cache_hit": cache_hit
             }
         except Exception as e:
             logger.error("Error searching software info: %s", e)
@@ -85,96 +217,131 @@ class CriticalityAssessor:
                 "error": str(e)
             }
     
+    def _embed_pair(self, company_name: str, software_name: str) -> Optional[List[float]]:
+        """Embed a (company, software) pair for semantic cache lookups."""
+        if self.embeddings is None:
+            return None
+        try:
+            vector = self.embeddings.embed_query(f"{company_name}|{software_name}")
+            return SemanticCache.normalize(vector)
+        except Exception as e:
+            logger.warning("Semantic cache embedding failed: %s", e)
+            return None
+    
+    @staticmethod
+    def _format_context(search_results: List[dict]) -> str:
+        """
+        Format Tavily search results as prompt context.
+        
+        Strips HTML tags, truncates each result's content, skips near-duplicate
+        sources and caps the total context length to keep input tokens down.
+        """
+        seen = set()
+        parts = []
+        for r in search_results:
+            content = _HTML_TAG_RE.sub("", r.get("content") or "")[:CONTENT_MAX_CHARS]
+            fingerprint = hashlib.md5(content[:FINGERPRINT_CHARS].encode()).hexdigest()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            parts.append(f"Source: {r.get('title', 'Unknown')}\nContent: {content}")
+        
+        return "\n\n".join(parts)[:CONTEXT_MAX_CHARS]
+    
+    @staticmethod
+    def _to_assessment(company_name: str, software_name: str,
+                       result: CriticalityAnalysisOutput) -> CriticalityAssessment:
+        """Convert structured LLM output into a CriticalityAssessment."""
+        return CriticalityAssessment(
+            company_name=company_name,
+            software_name=software_name,
+            criticality=result.criticality_level,
+            reasoning=result.reasoning[:REASONING_MAX_LENGTH],  # Limit length
+            # Capture chain-of-thought fields
+            company_business=result.company_business,
+            software_purpose=result.software_purpose,
+            relevance=result.relevance,
+            impact_if_unavailable=result.impact_if_unavailable
+        )
+    
+    def _invoke_analysis(self, prompt: str) -> tuple:
+        """
+        Run the criticality prompt and parse the JSON reply directly.
+        
+        Validating the raw JSON with pydantic-core in one pass skips the
+        structured-output tool-calling adapter. Only replies with no valid
+        analysis object fall back to the structured-output LLM.
+        
+        Returns:
+            Tuple of (CriticalityAnalysisOutput, list of raw LLM responses)
+        """
+        response = self.llm.invoke(prompt + JSON_ONLY_INSTRUCTION)
+        try:
+            return _parse_analysis(response.content or ""), [response]
+        except ValueError as e:
+            logger.warning("Falling back to structured output for criticality analysis: %s", e)
+        
+        fallback = self.structured_llm.invoke(prompt)
+        if fallback["parsed"] is None:
+            raise fallback["parsing_error"] or ValueError("structured output returned no analysis")
+        return fallback["parsed"], [response, fallback["raw"]]
+    
     def assess_criticality(self, company_name: str, software_name: str, 
                           company_info: List[dict], software_info: List[dict]) -> tuple:
-        """Assess business criticality using LLM with structured outputs."""
+        """
+        Assess business criticality using LLM with structured outputs.
+        
+        Returns:
+            Tuple of (CriticalityAssessment, elapsed_time, cost_info, cache_hit, error),
+            where error is None unless the default MEDIUM fallback was used
+        """
         start_time = time.time()
         
-        # Prepare context
-        company_context = "\n\n".join([
-            f"Source: {r.get('title', 'Unknown')}\nContent: {r.get('content', '')}"
-            for r in company_info
-        ])
+        # Reuse a prior analysis for a near-duplicate (company, software) pair
+        cache_vector = self._embed_pair(company_name, software_name)
+        if cache_vector is not None:
+            cached, score = self.semantic_cache.lookup(cache_vector)
+            # Similar embeddings can still name a different product; only reuse
+            # analyses of exactly the same software
+            if cached is not None and cached["software_key"] == _software_key(software_name):
+                logger.info("Semantic cache hit for %s @ %s (similarity %.3f)",
+                            software_name, company_name, score)
+                assessment = CriticalityAssessment(
+                    **cached["assessment"],
+                    company_name=company_name,
+                    software_name=software_name
+                )
+                return assessment, time.time() - start_time, {}, True, None
         
-        software_context = "\n\n".join([
-            f"Source: {r.get('title', 'Unknown')}\nContent: {r.get('content', '')}"
-            for r in software_info
-        ])
+        # Prepare context
+        company_context = self._format_context(company_info)
+        software_context = self._format_context(software_info)
         
-        prompt = f"""You are a business analyst assessing software criticality.
-
-COMPANY: {company_name}
-SOFTWARE: {software_name}
-
-COMPANY CONTEXT:
-{company_context}
-
-SOFTWARE CONTEXT:
-{software_context}
-
-Analyze the business criticality by thinking through these steps:
-
-1. COMPANY BUSINESS: Describe {company_name}'s primary business in 1-2 sentences
-2. SOFTWARE PURPOSE: Describe what {software_name} does in 1-2 sentences  
-3. RELEVANCE: Explain how {software_name} relates to {company_name}'s business (1-2 sentences)
-4. IMPACT IF UNAVAILABLE: Describe what would happen if {software_name} was unavailable (1-2 sentences)
-
-Then determine CRITICALITY LEVEL using these guidelines:
-- HIGH: Critical to core business operations, revenue-generating, or security-critical
-  Examples: IDE @ Software Company, Identity Management @ Bank, Payment Processor @ E-commerce
-- MEDIUM: Important for productivity but not core to business model
-  Examples: Analytics Tool @ Any Company, Project Management @ Tech Company
-- LOW: Nice-to-have, minimal business impact if unavailable
-  Examples: Wallpaper App @ Bank, Entertainment Tool @ Enterprise
-
-EXAMPLES:
-- Okta Workforce Identity @ Citi Bank → HIGH (security-critical, regulatory requirement)
-- IDE @ Software Company → HIGH (core productivity tool for primary business)
-- Analytics Tool @ E-commerce → MEDIUM (helpful insights but not essential)
-
-You must respond with a structured JSON object with these exact fields:
-- company_business: string describing the company's primary business
-- software_purpose: string describing what the software does
-- relevance: string explaining how the software relates to the company's business
-- impact_if_unavailable: string describing impact if software was unavailable
-- criticality_level: one of "low", "medium", or "high"
-- reasoning: 2-3 sentences explaining the criticality level
-- confidence: one of "low", "medium", or "high"
-
-Provide your analysis now."""
+        prompt = build_criticality_prompt(company_name, software_name, company_context, software_context)
 
         try:
-            # Use structured output with Pydantic model
-            # Include schema explicitly to help the model
-            structured_llm = self.llm.with_structured_output(
-                CriticalityAnalysisOutput,
-                include_raw=False
-            )
-            result = structured_llm.invoke(prompt)
+            result, responses = self._invoke_analysis(prompt)
             
             elapsed = time.time() - start_time
             
-            # Extract token usage and calculate cost
+            # Extract token usage (summed over a fallback call) and calculate cost
             cost_info = {}
-            if hasattr(result, 'response_metadata') and 'token_usage' in result.response_metadata:
-                token_usage = result.response_metadata['token_usage']
-                input_tokens = token_usage.get('prompt_tokens', 0)
-                output_tokens = token_usage.get('completion_tokens', 0)
-                cost_info = calculate_cost(input_tokens, output_tokens, "gemini-2.0-flash-exp")
+            usages = [u for u in map(get_token_usage, responses) if u]
+            if usages:
+                input_tokens, output_tokens, cached_tokens = map(sum, zip(*usages))
+                cost_info = calculate_cost(
+                    input_tokens, output_tokens, "gemini-2.0-flash-exp", cached_tokens, detailed=True
+                )
             
-            assessment = CriticalityAssessment(
-                company_name=company_name,
-                software_name=software_name,
-                criticality=result.criticality_level,
-                reasoning=result.reasoning[:REASONING_MAX_LENGTH],  # Limit length
-                # Capture chain-of-thought fields
-                company_business=result.company_business,
-                software_purpose=result.software_purpose,
-                relevance=result.relevance,
-                impact_if_unavailable=result.impact_if_unavailable
-            )
+            assessment = self._to_assessment(company_name, software_name, result)
+            
+            if cache_vector is not None:
+                self.semantic_cache.add(cache_vector, {
+                    "software_key": _software_key(software_name),
+                    "assessment": assessment.model_dump(exclude={"company_name", "software_name"})
+                })
             
-            return assessment, elapsed, cost_info
+            return assessment, elapsed, cost_info, False, None
             
         except Exception as e:
             logger.error("Error assessing criticality: %s", e)
@@ -188,7 +355,7 @@ Provide your analysis now."""
                 software_name=software_name,
                 criticality=Criticality.MEDIUM,
                 reasoning=error_msg[:REASONING_MAX_LENGTH]
-            ), time.time() - start_time, {}
+            ), time.time() - start_time, {}, False, str(e)
     
     def assess(self, company_name: str, software_name: str) -> tuple:
         """
@@ -197,30 +364,59 @@ Provide your analysis now."""
         Returns:
             Tuple of (CriticalityAssessment, traces)
         """
-        traces = []
+        # Search company and software information concurrently (both are
+        # independent network-bound Tavily calls)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            company_future = executor.submit(self.search_company_info, company_name)
+            software_future = executor.submit(self.search_software_info, software_name)
+            company_search = company_future.result()
+            software_search = software_future.result()
+        
+        return self._assess_from_searches(company_name, software_name, company_search, software_search)
+    
+    async def aassess(self, company_name: str, software_name: str) -> tuple:
+        """
+        Async variant of assess() for use on an event loop.
         
-        # Search company information
-        company_search = self.search_company_info(company_name)
+        The blocking Tavily and Gemini SDK calls run in worker threads, so
+        other coroutines (e.g. the vulnerability assessment) keep running.
+        
+        Returns:
+            Tuple of (CriticalityAssessment, traces)
+        """
+        company_search, software_search = await asyncio.gather(
+            asyncio.to_thread(self.search_company_info, company_name),
+            asyncio.to_thread(self.search_software_info, software_name)
+        )
+        return await asyncio.to_thread(
+            self._assess_from_searches, company_name, software_name, company_search, software_search
+        )
+    
+    def _assess_from_searches(self, company_name: str, software_name: str,
+                              company_search: dict, software_search: dict) -> tuple:
+        """Run the criticality analysis on search results and build the traces."""
+        traces = []
         traces.append({
             "step": "company_search",
             "tool": "tavily",
             "query": company_search.get("query"),
             "elapsed_time": company_search.get("elapsed_time"),
-            "results_count": len(company_search.get("results", []))
+            "results_count": len(company_search.get("results", [])),
+            "cache_hit": company_search.get("cache_hit", False),
+            **trace_error(company_search.get("error"))
         })
-        
-        # Search software information
-        software_search = self.search_software_info(software_name)
         traces.append({
             "step": "software_search",
             "tool": "tavily",
             "query": software_search.get("query"),
             "elapsed_time": software_search.get("elapsed_time"),
-            "results_count": len(software_search.get("results", []))
+            "results_count": len(software_search.get("results", [])),
+            "cache_hit": software_search.get("cache_hit", False),
+            **trace_error(software_search.get("error"))
         })
         
         # Assess criticality
-        assessment, elapsed, cost_info = self.assess_criticality(
+        assessment, elapsed, cost_info, cache_hit, error = self.assess_criticality(
             company_name,
             software_name,
             company_search.get("results", []),
@@ -231,7 +427,13 @@ Provide your analysis now."""
             "step": "criticality_analysis",
             "tool": "gemini",
             "elapsed_time": elapsed,
-            "criticality": assessment.criticality.value
+            "criticality": assessment.criticality.value,
+            "semantic_cache_hit": cache_hit,
+            "search_cache": {
+                "hits": self.search_cache.hits,
+                "misses": self.search_cache.misses
+            },
+            **trace_error(error)
         }
         if cost_info:
             trace_data["cost"] = cost_info
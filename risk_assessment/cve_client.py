@@ -2,36 +2,91 @@
 Direct CVE database client for querying NVD API.
 """
 
+import copy
+import math
 import time
+import bisect
+import asyncio
 import logging
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 
+from .utils import NVDCache, RateLimiter, TTLCache
+
 logger = logging.getLogger(__name__)
 
+# Cap on in-flight NVD requests; the request rate is enforced separately
+MAX_CONCURRENT_REQUESTS = 5
+# NVD public rate limits: 5 requests per rolling 30s window without an API key,
+# 50 with one
+NVD_RATE_WINDOW_SECONDS = 30
+NVD_RATE_LIMIT = 5
+NVD_RATE_LIMIT_WITH_KEY = 50
+CACHE_TTL_SECONDS = 6 * 60 * 60
+CACHE_MAX_ENTRIES = 1024
+CPE_LOOKUP_RESULTS = 20
+
+# CVSS v2 severity buckets: (0, 4.0) low, [4.0, 7.0) medium, [7.0, 10.0] high.
+# The first threshold is the smallest positive float so that any score > 0 is "low".
+_V2_THRESHOLDS = (math.nextafter(0.0, 1.0), 4.0, 7.0)
+_V2_LABELS = ("unknown", "low", "medium", "high")
+
 
 class CVEDatabaseClient:
     """Direct integration with National Vulnerability Database (NVD) API."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        disk_cache: Optional[NVDCache] = None
+    ):
         """
         Initialize CVE database client.
         
         Args:
             api_key: Optional NVD API key for higher rate limits
+            rate_limiter: Limiter shared by every NVD request this client makes
+                (default: NVD's published limit for keyed/unkeyed access)
+            disk_cache: Optional on-disk cache persisting results across processes
         """
         self.nvd_base_url = "https://services.nvd.nist.gov/rest/json/cves/2.0"
+        self.cpe_url = "https://services.nvd.nist.gov/rest/json/cpes/2.0"
         self.api_key = api_key
         self.session = requests.Session()
+        # Size the connection pool for concurrent lookups so TLS connections are reused
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+        self.session.mount("https://", adapter)
+        # Request compressed JSON; ACCEPT_ENCODING only lists codings urllib3 can
+        # decode here (gzip/deflate, plus br/zstd when brotli/zstandard are installed)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Accept-Encoding": ACCEPT_ENCODING
+        })
         if api_key:
             self.session.headers.update({"apiKey": api_key})
+        self.rate_limiter = rate_limiter or RateLimiter(
+            NVD_RATE_LIMIT_WITH_KEY if api_key else NVD_RATE_LIMIT,
+            NVD_RATE_WINDOW_SECONDS
+        )
+        # Parsed results keyed by (software_name, days_back, max_results), in
+        # memory and optionally persisted to disk under the same key
+        self._cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+        self.disk_cache = disk_cache
+        # software_name (lowercased) -> {"cpe": match string or None}; also
+        # persisted to disk_cache so each product is resolved once across runs
+        self._cpe_cache = TTLCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
     
     def search_cves(
         self, 
         software_name: str, 
         days_back: int = 730,  # 2 years default
-        max_results: int = 100
+        max_results: int = 100,
+        include_unanalyzed: bool = False
     ) -> Dict:
         """
         Search NVD database for CVEs related to software.
@@ -40,47 +95,81 @@ class CVEDatabaseClient:
             software_name: Name of the software to search
             days_back: Number of days to look back
             max_results: Maximum number of results
+            include_unanalyzed: When a CPE match is used, also run a keyword
+                search to pick up recent CVEs NVD has not yet mapped to CPEs
+                (costs one extra NVD request)
             
         Returns:
             Dict containing CVE data and metadata
         """
         start_time = time.time()
         
+        cache_key = (software_name.lower(), days_back, max_results, include_unanalyzed)
+        cached, tier = self._cache.get(cache_key), "memory"
+        if cached is None and self.disk_cache is not None:
+            cached, tier = self.disk_cache.get(_disk_key(*cache_key)), "disk"
+            if cached is not None:
+                self._cache.set(cache_key, cached)
+        if cached is not None:
+            result = copy.deepcopy(cached)
+            result["query"] = software_name
+            result["elapsed_time"] = time.time() - start_time
+            result["source"] = "nvd_cache"
+            result["cache_tier"] = tier
+            return result
+        
         # Calculate date range
         end_date = datetime.now()
         start_date = end_date - timedelta(days=days_back)
         
+        # Prefer a CPE match, which returns only CVEs for that product;
+        # fall back to keyword search when no unambiguous product CPE is known
+        cpe = self._resolve_cpe(software_name)
+        
         # Build params with proper ISO 8601 date format for NVD API v2.0
-        params = {
-            "keywordSearch": software_name,
-            "resultsPerPage": min(max_results, 2000)  # API limit
-        }
+        params = {"resultsPerPage": min(max_results, 2000)}  # API limit
         
         # Add date filters in ISO 8601 format (required by NVD API v2.0)
         # Format: YYYY-MM-DDTHH:MM:SS.000 (with .000 for milliseconds)
-        params["pubStartDate"] = start_date.strftime("%Y-%m-%dT%H:%M:%S.000")
-        params["pubEndDate"] = end_date.strftime("%Y-%m-%dT%H:%M:%S.000")
+        params["pubStartDate"] = _iso(start_date)
+        params["pubEndDate"] = _iso(end_date)
         
         try:
-            response = self.session.get(
-                self.nvd_base_url,
-                params=params,
-                timeout=30
-            )
-            response.raise_for_status()
+            data = {}
+            if cpe:
+                data = self._get_json(self.nvd_base_url, {"virtualMatchString": cpe, **params})
+            vulnerabilities = data.get("vulnerabilities", [])
+            total_results = data.get("totalResults", 0)
             
-            data = response.json()
+            if not vulnerabilities:
+                # No CPE, or nothing matched it: search by keyword instead
+                data = self._get_json(self.nvd_base_url, {"keywordSearch": software_name, **params})
+                vulnerabilities = data.get("vulnerabilities", [])
+                total_results = data.get("totalResults", 0)
+            elif include_unanalyzed:
+                # CPE matching only covers CVEs NVD has analyzed; add keyword
+                # hits that have no configurations yet
+                keyword_data = self._get_json(self.nvd_base_url, {"keywordSearch": software_name, **params})
+                merged = _merge_unanalyzed(vulnerabilities, keyword_data.get("vulnerabilities", []))
+                total_results += len(merged) - len(vulnerabilities)
+                vulnerabilities = merged
             elapsed = time.time() - start_time
             
-            return {
-                "cves": self._parse_cve_data(data),
-                "total_results": data.get("totalResults", 0),
+            result = {
+                "cves": self._parse_cve_data({"vulnerabilities": vulnerabilities}),
+                "total_results": total_results,
                 "query": software_name,
+                "cpe": cpe,
                 "elapsed_time": elapsed,
                 "source": "nvd_api"
             }
+            self._cache.set(cache_key, copy.deepcopy(result))
+            if self.disk_cache is not None:
+                self.disk_cache.set(_disk_key(*cache_key), result)
             
-        except requests.exceptions.RequestException as e:
+            return result
+            
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
             elapsed = time.time() - start_time
             logger.error("Error fetching CVEs from NVD: %s", e)
             return {
@@ -92,48 +181,131 @@ class CVEDatabaseClient:
                 "error": str(e)
             }
     
-    def _parse_cve_data(self, nvd_response: Dict) -> List[Dict]:
+    def _resolve_cpe(self, software_name: str) -> Optional[str]:
         """
-        Parse NVD API response into structured CVE data.
+        Resolve software to a CPE match string (cpe:2.3:part:vendor:product).
+        
+        Only CPEs whose product component equals the normalized software name
+        are considered, and only if they all belong to a single vendor, so
+        similarly named products and same-named products of other vendors are
+        never substituted. Results are cached in memory and on disk; failed
+        requests are not cached.
         
         Args:
-            nvd_response: Raw response from NVD API
+            software_name: Name of the software to resolve
             
         Returns:
-            List of parsed CVE dictionaries
+            CPE match string covering all versions, or None if no unambiguous match
         """
-        cves = []
+        key = software_name.lower()
+        cached = self._cpe_cache.get(key)
+        if cached is None and self.disk_cache is not None:
+            cached = self.disk_cache.get(f"cpe|{key}")
+        if cached is not None:
+            self._cpe_cache.set(key, cached)
+            return cached.get("cpe")
         
-        vulnerabilities = nvd_response.get("vulnerabilities", [])
+        product = _cpe_product_name(software_name)
+        try:
+            products = self._get_json(
+                self.cpe_url,
+                {"keywordSearch": software_name, "resultsPerPage": CPE_LOOKUP_RESULTS}
+            ).get("products", [])
+        except (requests.exceptions.RequestException, orjson.JSONDecodeError) as e:
+            logger.warning("CPE lookup failed for %s: %s", software_name, e)
+            return None
         
-        for item in vulnerabilities:
-            cve = item.get("cve", {})
-            cve_id = cve.get("id", "Unknown")
-            
-            # Extract description
-            descriptions = cve.get("descriptions", [])
-            description = next(
-                (d.get("value", "") for d in descriptions if d.get("lang") == "en"),
-                "No description available"
-            )
-            
-            # Extract severity metrics
-            metrics = cve.get("metrics", {})
-            severity, cvss_score = self._extract_severity(metrics)
+        # cpe:2.3:part:vendor:product:version:... -> distinct part:vendor:product prefixes
+        matches = set()
+        for entry in products:
+            parts = entry.get("cpe", {}).get("cpeName", "").split(":")
+            if len(parts) > 4 and parts[4] == product:
+                matches.add(":".join(parts[:5]))
+        
+        cpe = next(iter(matches)) if len(matches) == 1 else None
+        if len(matches) > 1:
+            logger.info("Multiple vendors ship %s; using keyword search", software_name)
+        
+        entry = {"cpe": cpe}
+        self._cpe_cache.set(key, entry)
+        if self.disk_cache is not None:
+            self.disk_cache.set(f"cpe|{key}", entry)
+        return cpe
+    
+    def cache_stats(self) -> Dict:
+        """Hit/miss counters for the in-memory and on-disk result caches."""
+        stats = {"memory": {"hits": self._cache.hits, "misses": self._cache.misses}}
+        if self.disk_cache is not None:
+            stats["disk"] = {"hits": self.disk_cache.hits, "misses": self.disk_cache.misses}
+        return stats
+    
+    def _get_json(self, url: str, params: Dict) -> Dict:
+        """GET an NVD endpoint within the rate limit and decode the JSON body."""
+        self.rate_limiter.acquire()
+        response = self.session.get(url, params=params, timeout=30)
+        response.raise_for_status()
+        return orjson.loads(response.content)
+    
+    async def search_cves_async(
+        self,
+        software_name: str,
+        days_back: int = 730,
+        max_results: int = 100
+    ) -> Dict:
+        """
+        Async variant of search_cves that runs the blocking request in a worker thread.
+        
+        Args:
+            software_name: Name of the software to search
+            days_back: Number of days to look back
+            max_results: Maximum number of results
             
-            # Extract published date
-            published = cve.get("published", "")
+        Returns:
+            Dict containing CVE data and metadata
+        """
+        return await asyncio.to_thread(self.search_cves, software_name, days_back, max_results)
+    
+    async def search_cves_many(
+        self,
+        software_names: List[str],
+        days_back: int = 730,
+        max_results: int = 100,
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS
+    ) -> List[Dict]:
+        """
+        Search CVEs for several software names concurrently.
+        
+        Args:
+            software_names: Names of the software to search
+            days_back: Number of days to look back
+            max_results: Maximum number of results per search
+            max_concurrency: Maximum number of in-flight NVD requests
+                (the request rate is still bounded by the client's rate limiter)
             
-            cves.append({
-                "cve_id": cve_id,
-                "description": description,
-                "severity": severity,
-                "cvss_score": cvss_score,
-                "published_date": published,
-                "source_url": f"https://nvd.nist.gov/vuln/detail/{cve_id}"
-            })
+        Returns:
+            List of search results in the same order as software_names
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def search_one(software_name: str) -> Dict:
+            async with semaphore:
+                return await self.search_cves_async(software_name, days_back, max_results)
+        
+        return await asyncio.gather(*(search_one(name) for name in software_names))
+    
+    def _parse_cve_data(self, nvd_response: Dict) -> List[Dict]:
+        """
+        Parse NVD API response into structured CVE data.
         
-        return cves
+        Args:
+            nvd_response: Raw response from NVD API
+            
+        Returns:
+            List of parsed CVE dictionaries
+        """
+        # Parsed serially on purpose: a full 2000-record page takes a few ms, and
+        # shipping records to a process pool costs more in pickling than it saves.
+        return [_parse_cve_item(item) for item in nvd_response.get("vulnerabilities", [])]
     
     def _extract_severity(self, metrics: Dict) -> tuple:
         """
@@ -144,39 +316,95 @@ class CVEDatabaseClient:
         Returns:
             Tuple of (severity_string, cvss_score)
         """
-        # Try CVSS v3.1
-        cvss_v31 = metrics.get("cvssMetricV31", [])
-        if cvss_v31:
-            cvss_data = cvss_v31[0].get("cvssData", {})
-            return (
-                cvss_data.get("baseSeverity", "unknown").lower(),
-                cvss_data.get("baseScore", None)
-            )
-        
-        # Try CVSS v3.0
-        cvss_v30 = metrics.get("cvssMetricV30", [])
-        if cvss_v30:
-            cvss_data = cvss_v30[0].get("cvssData", {})
-            return (
-                cvss_data.get("baseSeverity", "unknown").lower(),
-                cvss_data.get("baseScore", None)
-            )
-        
-        # Try CVSS v2.0
-        cvss_v2 = metrics.get("cvssMetricV2", [])
-        if cvss_v2:
-            base_score = cvss_v2[0].get("cvssData", {}).get("baseScore", 0.0)
-            return (self._v2_score_to_severity(base_score), base_score)
-        
-        return ("unknown", None)
+        return _extract_severity(metrics)
     
     def _v2_score_to_severity(self, score: float) -> str:
         """Convert CVSS v2 score to severity label."""
-        if score >= 7.0:
-            return "high"
-        elif score >= 4.0:
-            return "medium"
-        elif score > 0:
-            return "low"
-        return "unknown"
+        return _v2_score_to_severity(score)
+
+
+def _disk_key(software_name: str, days_back: int, max_results: int,
+              include_unanalyzed: bool = False) -> str:
+    """Build the on-disk cache key for a CVE search, including its parameters."""
+    key = f"cves|{software_name}|days={days_back}|max={max_results}"
+    return f"{key}|unanalyzed" if include_unanalyzed else key
+
+
+def _merge_unanalyzed(cpe_items: List[Dict], keyword_items: List[Dict]) -> List[Dict]:
+    """
+    Add keyword-search CVEs that NVD has not analyzed yet to CPE-matched CVEs.
+    
+    Keyword hits that already have CPE configurations and did not match the
+    product's CPE belong to other products, so they are dropped.
+    """
+    seen = {item.get("cve", {}).get("id") for item in cpe_items}
+    return cpe_items + [
+        item for item in keyword_items
+        if not item.get("cve", {}).get("configurations") and item.get("cve", {}).get("id") not in seen
+    ]
+
+
+def _cpe_product_name(software_name: str) -> str:
+    """Normalize a software name to the CPE product naming convention."""
+    return "_".join(software_name.lower().split())
+
+
+def _iso(d: datetime) -> str:
+    """Format a datetime as YYYY-MM-DDTHH:MM:SS.000 for the NVD API."""
+    return f"{d.year:04d}-{d.month:02d}-{d.day:02d}T{d.hour:02d}:{d.minute:02d}:{d.second:02d}.000"
+
+
+def _parse_cve_item(item: Dict) -> Dict:
+    """Parse a single NVD vulnerability entry into a CVE dictionary."""
+    cve = item.get("cve", {})
+    cve_id = cve.get("id", "Unknown")
+    
+    # Extract description
+    description = next(
+        (d.get("value", "") for d in cve.get("descriptions", ()) if d.get("lang") == "en"),
+        "No description available"
+    )
+    
+    # Extract severity metrics
+    severity, cvss_score = _extract_severity(cve.get("metrics", {}))
+    
+    return {
+        "cve_id": cve_id,
+        "description": description,
+        "severity": severity,
+        "cvss_score": cvss_score,
+        "published_date": cve.get("published", ""),
+        "source_url": f"https://nvd.nist.gov/vuln/detail/{cve_id}"
+    }
+
+
+def _extract_severity(metrics: Dict) -> tuple:
+    """
+    Extract severity rating and CVSS score from CVE metrics.
+    
+    Priority: CVSS v3.1 > CVSS v3.0 > CVSS v2.0
+    
+    Returns:
+        Tuple of (severity_string, cvss_score)
+    """
+    # Try CVSS v3.1, then v3.0
+    cvss_v3 = metrics.get("cvssMetricV31") or metrics.get("cvssMetricV30")
+    if cvss_v3:
+        cvss_data = cvss_v3[0].get("cvssData", {})
+        return (
+            cvss_data.get("baseSeverity", "unknown").lower(),
+            cvss_data.get("baseScore", None)
+        )
+    
+    # Try CVSS v2.0
+    cvss_v2 = metrics.get("cvssMetricV2")
+    if cvss_v2:
+        base_score = cvss_v2[0].get("cvssData", {}).get("baseScore", 0.0)
+        return (_V2_LABELS[bisect.bisect_right(_V2_THRESHOLDS, base_score)], base_score)
+    
+    return ("unknown", None)
+
 
+def _v2_score_to_severity(score: float) -> str:
+    """Convert CVSS v2 score to severity label."""
+    return _V2_LABELS[bisect.bisect_right(_V2_THRESHOLDS, score)]
@@ -3,13 +3,50 @@ Decision policy for risk assessment.
 Implements deterministic rules for approve/decline decisions.
 """
 
+from itertools import chain
+
 from .models import (
     Decision, 
     VulnerabilityAssessment, 
     CriticalityAssessment,
-    Criticality
+    Criticality,
+    SEVERITY_LOW,
+    SEVERITY_MEDIUM,
+    SEVERITY_HIGH,
+    SEVERITY_CRITICAL,
+    SEVERITY_UNKNOWN,
+    SEVERITY_ORDER
 )
 
+_FIXED_HEADER = ("# Risk Assessment Report", "")
+_SEVERITY_HEADER = "**Severity Distribution:**"
+
+# Severities that rule out the "only low-risk vulnerabilities" approval
+_NOT_LOW_RISK = SEVERITY_CRITICAL | SEVERITY_HIGH | SEVERITY_MEDIUM
+
+
+def _severity_profile(vuln: VulnerabilityAssessment) -> tuple[int, tuple]:
+    """
+    Derive the severity bitmask and counts from the assessment's current fields.
+    
+    Computed on every decision (never cached on the model), so copies and
+    in-place updates of severity_counts/has_critical/has_high are respected.
+    
+    Returns:
+        Tuple of (severity bitmask, counts in SEVERITY_ORDER)
+    """
+    counts = tuple(vuln.severity_counts.get(s, 0) for s in SEVERITY_ORDER)
+    _, _, medium, low, unknown = counts
+    # Critical/high bits follow the explicit flags
+    mask = (
+        (SEVERITY_CRITICAL if vuln.has_critical else 0)
+        | (SEVERITY_HIGH if vuln.has_high else 0)
+        | (SEVERITY_MEDIUM if medium else 0)
+        | (SEVERITY_LOW if low else 0)
+        | (SEVERITY_UNKNOWN if unknown else 0)
+    )
+    return mask, counts
+
 
 def make_decision(
     vulnerability_assessment: VulnerabilityAssessment,
@@ -37,34 +74,31 @@ def make_decision(
         )
         return Decision.APPROVE, reasoning
     
+    mask, (critical, high, medium, low, unknown) = _severity_profile(vuln)
+    
     # Check if only low-risk vulnerabilities exist
-    has_only_low_risk = (
-        not vuln.has_critical and 
-        not vuln.has_high and
-        vuln.severity_counts.get("medium", 0) == 0 and
-        vuln.severity_counts.get("low", 0) > 0
-    )
+    has_only_low_risk = not (mask & _NOT_LOW_RISK) and bool(mask & SEVERITY_LOW)
     
     # Rule 2: Medium-high importance AND only low-risk vulnerabilities → Approve
     if crit.criticality in [Criticality.MEDIUM, Criticality.HIGH] and has_only_low_risk:
         reasoning = (
             f"✓ APPROVED: {vuln.software_name} has {crit.criticality.value} business criticality "
-            f"for {crit.company_name} and only {vuln.severity_counts.get('low', 0)} low-risk "
-            f"vulnerabilit{'y' if vuln.severity_counts.get('low', 0) == 1 else 'ies'}. "
+            f"for {crit.company_name} and only {low} low-risk "
+            f"vulnerabilit{'y' if low == 1 else 'ies'}. "
             f"The security risk is acceptable given the business value."
         )
         return Decision.APPROVE, reasoning
     
     # Rule 3: Otherwise → Decline
     risk_details = []
-    if vuln.has_critical:
-        risk_details.append(f"{vuln.severity_counts.get('critical', 0)} critical")
-    if vuln.has_high:
-        risk_details.append(f"{vuln.severity_counts.get('high', 0)} high")
-    if vuln.severity_counts.get("medium", 0) > 0:
-        risk_details.append(f"{vuln.severity_counts.get('medium', 0)} medium")
-    if vuln.severity_counts.get("unknown", 0) > 0:
-        risk_details.append(f"{vuln.severity_counts.get('unknown', 0)} unknown severity")
+    if mask & SEVERITY_CRITICAL:
+        risk_details.append(f"{critical} critical")
+    if mask & SEVERITY_HIGH:
+        risk_details.append(f"{high} high")
+    if mask & SEVERITY_MEDIUM:
+        risk_details.append(f"{medium} medium")
+    if mask & SEVERITY_UNKNOWN:
+        risk_details.append(f"{unknown} unknown severity")
     
     # If we have vulnerabilities but no specific severity (edge case), mention count
     if not risk_details and vuln.total_count > 0:
@@ -88,38 +122,40 @@ def generate_final_summary(
     criticality_assessment: CriticalityAssessment
 ) -> str:
     """Generate a comprehensive final summary."""
+    va = vulnerability_assessment
+    ca = criticality_assessment
     
-    summary_parts = [
-        "# Risk Assessment Report",
-        "",
-        f"**Company:** {criticality_assessment.company_name}",
-        f"**Software:** {vulnerability_assessment.software_name}",
-        f"**Decision:** {decision.value.upper()}",
-        "",
-        "## Security Assessment",
-        f"{vulnerability_assessment.summary}",
-        "",
-        f"**Vulnerabilities Found:** {vulnerability_assessment.total_count}",
-    ]
-    
-    if vulnerability_assessment.total_count > 0:
-        summary_parts.append("**Severity Distribution:**")
-        for severity in ["critical", "high", "medium", "low"]:
-            count = vulnerability_assessment.severity_counts.get(severity, 0)
-            if count > 0:
-                summary_parts.append(f"  - {severity.capitalize()}: {count}")
-    
-    summary_parts.extend([
-        "",
-        "## Business Criticality Assessment",
-        f"**Criticality Level:** {criticality_assessment.criticality.value.upper()}",
-        "",
-        f"**Reasoning:** {criticality_assessment.reasoning}",
-        "",
-        "## Final Decision",
-        f"{decision_reasoning}",
-        "",
-    ])
+    severity_lines = (
+        [_SEVERITY_HEADER] + [
+            f"  - {severity.capitalize()}: {count}"
+            for severity in ("critical", "high", "medium", "low")
+            if (count := va.severity_counts.get(severity, 0)) > 0
+        ]
+        if va.total_count > 0 else []
+    )
     
-    return "\n".join(summary_parts)
-
+    return "\n".join(chain(
+        _FIXED_HEADER,
+        (
+            f"**Company:** {ca.company_name}",
+            f"**Software:** {va.software_name}",
+            f"**Decision:** {decision.value.upper()}",
+            "",
+            "## Security Assessment",
+            f"{va.summary}",
+            "",
+            f"**Vulnerabilities Found:** {va.total_count}",
+        ),
+        severity_lines,
+        (
+            "",
+            "## Business Criticality Assessment",
+            f"**Criticality Level:** {ca.criticality.value.upper()}",
+            "",
+            f"**Reasoning:** {ca.reasoning}",
+            "",
+            "## Final Decision",
+            f"{decision_reasoning}",
+            "",
+        ),
+    ))
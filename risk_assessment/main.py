@@ -3,22 +3,42 @@ CLI interface for the risk assessment workflow.
 """
 
 import os
-import json
+import asyncio
+import orjson
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from typing import TYPE_CHECKING
 import typer
 from dotenv import load_dotenv
 
-from .workflow import RiskAssessmentWorkflow
-from .models import RiskAssessmentOutput
 from .utils import setup_logging
 
+# The workflow pulls in langchain/langgraph/tavily, so it is imported lazily
+# to keep --help and argument errors fast
+if TYPE_CHECKING:
+    from .workflow import RiskAssessmentWorkflow
+    from .models import RiskAssessmentOutput
+
 # Load environment variables
 load_dotenv()
 
 # Setup logging
 setup_logging()
 
+# Maximum number of batch assessments running at once
+BATCH_CONCURRENCY = int(os.getenv("RISK_BATCH_CONCURRENCY", "8"))
+
+# Background threads writing batch outputs to disk
+SAVE_WORKERS = 2
+
+# Output file write buffer (large traces are written in one syscall)
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Output directories already created by save_output
+_created_dirs: set = set()
+
 app = typer.Typer(
     name="risk-assess",
     help="Agentic Risk Assessment Workflow - Assess software adoption risk",
@@ -35,7 +55,11 @@ def main(
     company: str = typer.Option(None, "--company", "-c", help="Name of the company"),
     output_dir: str = typer.Option("outputs", "--output", "-o", help="Directory to save output files"),
     no_save: bool = typer.Option(False, "--no-save", help="Don't save output to file"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached assessments and run fresh"),
     visualize: bool = typer.Option(False, "--visualize", "-v", help="Generate workflow graph visualization"),
+    semantic_cache: bool = typer.Option(
+        False, "--semantic-cache", help="Reuse criticality analyses for near-duplicate company names"
+    ),
 ):
     """
     Agentic Risk Assessment Workflow - Assess software adoption risk.
@@ -55,7 +79,68 @@ def main(
         raise typer.Exit()
     
     # Run assessment with provided options
-    run_assessment(software, company, output_dir, no_save, visualize)
+    run_assessment(software, company, output_dir, no_save, visualize, use_cache=not no_cache,
+                   semantic_cache=semantic_cache)
+
+
+@lru_cache(maxsize=4)
+def _get_workflow(tavily_key: str, google_key: str,
+                  semantic_cache: bool = False) -> "RiskAssessmentWorkflow":
+    """Get a shared workflow (clients and compiled graph) for the given API keys and options."""
+    from .workflow import RiskAssessmentWorkflow
+    
+    return RiskAssessmentWorkflow(
+        tavily_api_key=tavily_key,
+        google_api_key=google_key,
+        use_semantic_cache=semantic_cache
+    )
+
+
+def _run_cached(
+    workflow: "RiskAssessmentWorkflow",
+    company: str,
+    software: str,
+    use_cache: bool = True
+) -> "RiskAssessmentOutput":
+    """Run the workflow, reusing a recent cached output for the same pair."""
+    if not use_cache:
+        return workflow.run(company_name=company, software_name=software)
+    
+    from .cache import ResponseCache
+    
+    cache = ResponseCache()
+    output = cache.get(company, software)
+    if output is not None:
+        typer.echo(f"♻️  Using cached assessment for {software} @ {company}")
+        return output
+    
+    output = workflow.run(company_name=company, software_name=software)
+    cache.set(company, software, output)
+    return output
+
+
+async def _run_cached_async(
+    workflow: "RiskAssessmentWorkflow",
+    company: str,
+    software: str,
+    use_cache: bool = True,
+    err: bool = False
+) -> "RiskAssessmentOutput":
+    """Async variant of _run_cached using the workflow's native async path."""
+    if not use_cache:
+        return await workflow.arun(company_name=company, software_name=software)
+    
+    from .cache import ResponseCache
+    
+    cache = ResponseCache()
+    output = cache.get(company, software)
+    if output is not None:
+        typer.echo(f"♻️  Using cached assessment for {software} @ {company}", err=err)
+        return output
+    
+    output = await workflow.arun(company_name=company, software_name=software)
+    cache.set(company, software, output)
+    return output
 
 
 def run_assessment(
@@ -63,7 +148,9 @@ def run_assessment(
     company: str, 
     output_dir: str = "outputs",
     no_save: bool = False,
-    visualize: bool = False
+    visualize: bool = False,
+    use_cache: bool = True,
+    semantic_cache: bool = False
 ):
     """Core assessment logic."""
     # Check for API keys
@@ -82,17 +169,14 @@ def run_assessment(
     
     try:
         # Initialize workflow
-        workflow = RiskAssessmentWorkflow(
-            tavily_api_key=tavily_key,
-            google_api_key=google_key
-        )
+        workflow = _get_workflow(tavily_key, google_key, semantic_cache)
         
         # Visualize graph if requested
         if visualize:
             workflow.visualize()
         
         # Run assessment
-        output = workflow.run(company_name=company, software_name=software)
+        output = _run_cached(workflow, company, software, use_cache)
         
         # Print summary
         print("\n" + "="*80)
@@ -112,57 +196,34 @@ def run_assessment(
         raise typer.Exit(code=2)
 
 
-def save_output(output: RiskAssessmentOutput, output_dir: str = "outputs"):
-    """Save the assessment output to a JSON file."""
-    # Create output directory if it doesn't exist
-    Path(output_dir).mkdir(exist_ok=True)
+def save_output(output: "RiskAssessmentOutput", output_dir: str = "outputs", err: bool = False):
+    """
+    Save the assessment output to a JSON file.
+    
+    Args:
+        output: Assessment output to save
+        output_dir: Directory to save the file in
+        err: Print the status message to stderr (keeps stdout machine-readable)
+    """
+    # Create output directory once per process
+    if output_dir not in _created_dirs:
+        Path(output_dir).mkdir(exist_ok=True)
+        _created_dirs.add(output_dir)
     
-    # Generate filename
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Generate filename (the same timestamp is recorded in the file); microseconds
+    # keep repeated assessments of the same pair within a second apart
+    now = datetime.now()
+    timestamp = now.strftime("%Y%m%d_%H%M%S_%f")
     safe_company = output.company_name.replace(" ", "_").replace("/", "_")
     safe_software = output.software_name.replace(" ", "_").replace("/", "_")
-    filename = f"{safe_software}_{safe_company}_{timestamp}.json"
-    filepath = os.path.join(output_dir, filename)
-    
-    # Prepare output data
-    output_data = {
-        "timestamp": datetime.now().isoformat(),
-        "company_name": output.company_name,
-        "software_name": output.software_name,
-        "decision": output.decision.value,
-        "vulnerability_summary": output.vulnerability_summary,
-        "criticality_level": output.criticality_level.value,
-        "criticality_reasoning": output.criticality_reasoning,
-        "chain_of_thought": {
-            "company_business": output.company_business,
-            "software_purpose": output.software_purpose,
-            "relevance": output.relevance,
-            "impact_if_unavailable": output.impact_if_unavailable
-        },
-        "final_summary": output.final_summary,
-        "vulnerabilities": [
-            {
-                "cve_id": v.cve_id,
-                "severity": v.severity.value,
-                "cvss_score": v.cvss_score,
-                "description": v.description,
-                "source_url": v.source_url
-            }
-            for v in output.vulnerabilities
-        ],
-        "source_urls": output.source_urls,
-        "software_verification": {
-            "exists": output.software_exists,
-            "confidence": output.existence_confidence
-        },
-        "traces": output.traces
-    }
-    
-    # Save to file
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
-    
-    typer.echo(f"\n💾 Output saved to: {filepath}")
+    filepath = f"{output_dir}/{safe_software}_{safe_company}_{timestamp}.json"
+    
+    # Serialize natively with pydantic and save with a single buffered write
+    payload = output.to_export(now).to_json_bytes()
+    with open(filepath, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(payload)
+    
+    typer.echo(f"\n💾 Output saved to: {filepath}", err=err)
     return filepath
 
 
@@ -172,7 +233,11 @@ def assess_command(
     company: str = typer.Option(..., "--company", "-c", help="Name of the company"),
     output_dir: str = typer.Option("outputs", "--output", "-o", help="Directory to save output files"),
     no_save: bool = typer.Option(False, "--no-save", help="Don't save output to file"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached assessments and run fresh"),
     visualize: bool = typer.Option(False, "--visualize", "-v", help="Generate workflow graph visualization"),
+    semantic_cache: bool = typer.Option(
+        False, "--semantic-cache", help="Reuse criticality analyses for near-duplicate company names"
+    ),
 ):
     """
     Assess the risk of adopting software for a company.
@@ -180,13 +245,68 @@ def assess_command(
     Example:
         python run.py assess --software "Tiles" --company "Shopify"
     """
-    run_assessment(software, company, output_dir, no_save, visualize)
+    run_assessment(software, company, output_dir, no_save, visualize, use_cache=not no_cache,
+                   semantic_cache=semantic_cache)
+
+
+async def _batch_async(
+    workflow: "RiskAssessmentWorkflow",
+    requests: list,
+    output_dir: str,
+    use_cache: bool = True,
+    err: bool = False
+) -> list:
+    """
+    Run batch assessments concurrently, bounded by BATCH_CONCURRENCY.
+    
+    Progress messages go to stderr when err is set, so stdout only carries
+    the summary.
+    
+    Returns:
+        Result summaries in the same order as the requests
+    """
+    semaphore = asyncio.Semaphore(max(1, BATCH_CONCURRENCY))
+    total = len(requests)
+    done = 0
+    
+    async def process(req: dict) -> dict:
+        nonlocal done
+        async with semaphore:
+            output = await _run_cached_async(
+                workflow,
+                req["company"],
+                req["software"],
+                use_cache,
+                err
+            )
+        
+        # Save outside the semaphore so the next assessment starts right away
+        filepath = await loop.run_in_executor(saver, save_output, output, output_dir, err)
+        
+        done += 1
+        typer.echo(f"[{done}/{total}] Completed {req['software']} @ {req['company']}", err=err)
+        return {
+            "company": req["company"],
+            "software": req["software"],
+            "decision": output.decision.value,
+            "output_file": filepath
+        }
+    
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=SAVE_WORKERS) as saver:
+        tasks = [asyncio.create_task(process(req)) for req in requests]
+        return await asyncio.gather(*tasks)
 
 
 @app.command()
 def batch(
     input_file: str = typer.Argument(..., help="Path to JSON file with assessment requests"),
     output_dir: str = typer.Option("outputs", "--output", "-o", help="Directory to save output files"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="Ignore cached assessments and run fresh"),
+    json_output: bool = typer.Option(False, "--json", help="Print the batch summary as JSON"),
+    semantic_cache: bool = typer.Option(
+        False, "--semantic-cache", help="Reuse criticality analyses for near-duplicate company names"
+    ),
 ):
     """
     Run batch assessments from a JSON input file.
@@ -207,43 +327,32 @@ def batch(
     
     try:
         # Load input file
-        with open(input_file, "r", encoding="utf-8") as f:
-            requests = json.load(f)
+        requests = orjson.loads(Path(input_file).read_bytes())
         
         # Initialize workflow
-        workflow = RiskAssessmentWorkflow(
-            tavily_api_key=tavily_key,
-            google_api_key=google_key
+        workflow = _get_workflow(tavily_key, google_key, semantic_cache)
+        
+        # Process requests concurrently on a single event loop; with --json,
+        # progress goes to stderr so stdout holds only the JSON document
+        results = asyncio.run(
+            _batch_async(workflow, requests, output_dir, use_cache=not no_cache, err=json_output)
         )
         
-        # Process each request
-        results = []
-        for i, req in enumerate(requests, 1):
-            typer.echo(f"\n{'='*80}")
-            typer.echo(f"Processing {i}/{len(requests)}")
-            typer.echo(f"{'='*80}")
-            
-            output = workflow.run(
-                company_name=req["company"],
-                software_name=req["software"]
-            )
-            
-            filepath = save_output(output, output_dir)
-            results.append({
-                "company": req["company"],
-                "software": req["software"],
-                "decision": output.decision.value,
-                "output_file": filepath
-            })
+        # Print summary in a single write
+        if json_output:
+            typer.echo(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode("utf-8"))
+            return
         
-        # Print summary
-        typer.echo(f"\n{'='*80}")
-        typer.echo(f"✅ Batch processing complete: {len(results)} assessments")
-        typer.echo(f"{'='*80}\n")
-        
-        for result in results:
-            status = "✓" if result["decision"] == "approve" else "✗"
-            typer.echo(f"{status} {result['software']} @ {result['company']}: {result['decision'].upper()}")
+        lines = [
+            f"\n{'='*80}",
+            f"✅ Batch processing complete: {len(results)} assessments",
+            f"{'='*80}\n"
+        ]
+        lines.extend(
+            f"{'✓' if r['decision'] == 'approve' else '✗'} {r['software']} @ {r['company']}: {r['decision'].upper()}"
+            for r in results
+        )
+        typer.echo("\n".join(lines))
         
     except Exception as e:
         typer.echo(f"\n❌ Error: {str(e)}", err=True)
@@ -2,9 +2,11 @@
 Data models for the risk assessment workflow.
 """
 
+from datetime import datetime
 from enum import Enum
 from typing import List, Optional
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
+from pydantic_core import to_json
 
 
 class Severity(str, Enum):
@@ -29,6 +31,17 @@ class Decision(str, Enum):
     DECLINE = "decline"
 
 
+# Severity bits used by the decision policy
+SEVERITY_LOW = 1
+SEVERITY_MEDIUM = 2
+SEVERITY_HIGH = 4
+SEVERITY_CRITICAL = 8
+SEVERITY_UNKNOWN = 16
+
+# Order of the severity counts tuple used by the decision policy
+SEVERITY_ORDER = ("critical", "high", "medium", "low", "unknown")
+
+
 class Vulnerability(BaseModel):
     """Represents a single vulnerability/CVE."""
     cve_id: Optional[str] = None
@@ -39,6 +52,26 @@ class Vulnerability(BaseModel):
     source_url: Optional[str] = None  # Where this information was found
 
 
+class SourceURL(BaseModel):
+    """A search result used as evidence for the assessment."""
+    title: str = ""
+    url: str = ""
+    content_preview: str = ""
+
+
+class Trace(BaseModel):
+    """
+    A single workflow step trace.
+    
+    Step-specific fields (query, results_count, cost, ...) are kept as extras.
+    """
+    model_config = ConfigDict(extra="allow")
+    
+    step: str
+    tool: Optional[str] = None
+    elapsed_time: Optional[float] = None
+
+
 class VulnerabilityAssessment(BaseModel):
     """Results of vulnerability assessment."""
     software_name: str
@@ -49,7 +82,7 @@ class VulnerabilityAssessment(BaseModel):
     has_high: bool = False
     security_update_cadence: str = "unknown"
     summary: str = ""
-    source_data: List[dict] = Field(default_factory=list)  # Raw search results for verification
+    source_data: List[SourceURL] = Field(default_factory=list)  # Raw search results for verification
     software_exists: bool = True  # Whether software was verified to exist
     existence_confidence: str = "unknown"  # Confidence level: high, low, none, unknown
 
@@ -83,7 +116,7 @@ class RiskAssessmentState(BaseModel):
     final_summary: str = ""
     
     # Metadata
-    traces: List[dict] = Field(default_factory=list)
+    traces: List[Trace] = Field(default_factory=list)
 
 
 class RiskAssessmentOutput(BaseModel):
@@ -95,9 +128,9 @@ class RiskAssessmentOutput(BaseModel):
     criticality_level: Criticality
     criticality_reasoning: str
     final_summary: str
-    traces: List[dict] = Field(default_factory=list)
+    traces: List[Trace] = Field(default_factory=list)
     vulnerabilities: List[Vulnerability] = Field(default_factory=list)  # Detailed vuln list with sources
-    source_urls: List[dict] = Field(default_factory=list)  # URLs where data came from
+    source_urls: List[SourceURL] = Field(default_factory=list)  # URLs where data came from
     software_exists: bool = True  # Whether software was verified to exist
     existence_confidence: str = "unknown"  # Confidence level: high, low, none, unknown
     # Chain-of-thought reasoning fields from criticality assessment
@@ -106,3 +139,79 @@ class RiskAssessmentOutput(BaseModel):
     relevance: Optional[str] = None
     impact_if_unavailable: Optional[str] = None
 
+    def to_export(self, timestamp: Optional[datetime] = None) -> "RiskAssessmentExport":
+        """
+        Build the model written to disk by the CLI.
+        
+        Args:
+            timestamp: Time of the export (defaults to now)
+            
+        Returns:
+            RiskAssessmentExport with the saved-file layout
+        """
+        return RiskAssessmentExport(
+            timestamp=(timestamp or datetime.now()).isoformat(),
+            company_name=self.company_name,
+            software_name=self.software_name,
+            decision=self.decision,
+            vulnerability_summary=self.vulnerability_summary,
+            criticality_level=self.criticality_level,
+            criticality_reasoning=self.criticality_reasoning,
+            chain_of_thought=ChainOfThought(
+                company_business=self.company_business,
+                software_purpose=self.software_purpose,
+                relevance=self.relevance,
+                impact_if_unavailable=self.impact_if_unavailable
+            ),
+            final_summary=self.final_summary,
+            vulnerabilities=self.vulnerabilities,
+            source_urls=self.source_urls,
+            software_verification=SoftwareVerification(
+                exists=self.software_exists,
+                confidence=self.existence_confidence
+            ),
+            traces=self.traces
+        )
+
+
+class ChainOfThought(BaseModel):
+    """Chain-of-thought reasoning from the criticality assessment."""
+    company_business: Optional[str] = None
+    software_purpose: Optional[str] = None
+    relevance: Optional[str] = None
+    impact_if_unavailable: Optional[str] = None
+
+
+class SoftwareVerification(BaseModel):
+    """Result of verifying that the software exists."""
+    exists: bool
+    confidence: str
+
+
+class RiskAssessmentExport(BaseModel):
+    """Saved-file layout of a risk assessment (field order is the JSON key order)."""
+    timestamp: str
+    company_name: str
+    software_name: str
+    decision: Decision
+    vulnerability_summary: str
+    criticality_level: Criticality
+    criticality_reasoning: str
+    chain_of_thought: ChainOfThought
+    final_summary: str
+    vulnerabilities: List[Vulnerability] = Field(default_factory=list)
+    source_urls: List[SourceURL] = Field(default_factory=list)
+    software_verification: SoftwareVerification
+    traces: List[Trace] = Field(default_factory=list)
+    
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Serialize to JSON (published_date is not part of the saved vulnerability entries)."""
+        return self.to_json_bytes(indent).decode("utf-8")
+    
+    def to_json_bytes(self, indent: Optional[int] = 2) -> bytes:
+        """Serialize to UTF-8 JSON bytes for writing to disk, without an intermediate str."""
+        return to_json(
+            self,
+            indent=indent,
+            exclude={"vulnerabilities": {"__all__": {"published_date"}}}
+        )
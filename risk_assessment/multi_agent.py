@@ -3,7 +3,9 @@ Multi-agent consensus for more reliable assessments.
 Uses multiple LLMs and combines their judgments.
 """
 
+import io
 import asyncio
+from collections import Counter
 from typing import List, Optional, Dict
 from langchain_google_genai import ChatGoogleGenerativeAI
 
@@ -11,6 +13,9 @@ from .models import CriticalityAssessment, Criticality
 from .structured_outputs import CriticalityAnalysisOutput
 
 REASONING_MAX_LENGTH = 500
+CRITICALITY_RANK = {Criticality.LOW: 0, Criticality.MEDIUM: 1, Criticality.HIGH: 2}
+
+
 class MultiAgentConsensus:
     """
     Multi-agent consensus system for criticality assessment.
@@ -25,7 +30,8 @@ class MultiAgentConsensus:
         claude_api_key: Optional[str] = None,
         openai_api_key: Optional[str] = None,
         use_claude: bool = False,
-        use_openai: bool = False
+        use_openai: bool = False,
+        early_exit: bool = True
     ):
         """
         Initialize multi-agent system.
@@ -36,7 +42,9 @@ class MultiAgentConsensus:
             openai_api_key: OpenAI API key (optional)
             use_claude: Whether to include Claude in consensus
             use_openai: Whether to include OpenAI in consensus
+            early_exit: Stop waiting for models once a majority agrees
         """
+        self.early_exit = early_exit
         self.models = []
         
         # Always include Gemini
@@ -96,7 +104,8 @@ class MultiAgentConsensus:
             prompt: Assessment prompt
             
         Returns:
-            List of assessments from each model
+            List of assessments from each model (with early_exit, only
+            those received before a majority was reached)
         """
         async def get_assessment(model_info: Dict) -> Dict:
             """Get assessment from a single model."""
@@ -122,8 +131,25 @@ class MultiAgentConsensus:
                 }
         
         # Run all assessments in parallel
-        tasks = [get_assessment(model_info) for model_info in self.models]
-        results = await asyncio.gather(*tasks)
+        tasks = [asyncio.ensure_future(get_assessment(model_info)) for model_info in self.models]
+        if not self.early_exit:
+            return await asyncio.gather(*tasks)
+        
+        # Once a majority of models agree, later votes can't change the winner
+        majority_needed = len(tasks) // 2 + 1
+        votes = {level: 0 for level in Criticality}
+        results = []
+        try:
+            for future in asyncio.as_completed(tasks):
+                result = await future
+                results.append(result)
+                if result["success"]:
+                    votes[result["criticality"]] += 1
+                    if votes[result["criticality"]] >= majority_needed:
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
         
         return results
     
@@ -158,32 +184,25 @@ class MultiAgentConsensus:
                 reasoning="All models failed to provide assessment"
             )
         
-        # Count votes for each criticality level
-        votes = {
-            Criticality.LOW: 0,
-            Criticality.MEDIUM: 0,
-            Criticality.HIGH: 0
-        }
-        
-        for assessment in valid_assessments:
-            votes[assessment["criticality"]] += 1
-        
-        # Find winning criticality (most votes)
-        winner = max(votes.items(), key=lambda x: x[1])
-        consensus_criticality = winner[0]
-        
-        # Combine reasoning from all models
-        reasoning_parts = []
-        for assessment in valid_assessments:
-            reasoning_parts.append(
-                f"[{assessment['model'].upper()}]: {assessment['reasoning']}"
-            )
-        
-        combined_reasoning = " | ".join(reasoning_parts)
+        # Count votes; ties go to the most conservative (highest) criticality
+        votes = Counter(a["criticality"] for a in valid_assessments)
+        max_count = max(votes.values())
+        consensus_criticality = max(
+            (c for c, n in votes.items() if n == max_count),
+            key=CRITICALITY_RANK.__getitem__
+        )
         
-        # Add consensus info
-        vote_summary = f"Consensus: {winner[1]}/{len(valid_assessments)} models agreed. "
-        final_reasoning = vote_summary + combined_reasoning
+        # Combine vote summary and per-model reasoning, stopping once the
+        # length cap is reached instead of building the full string
+        buf = io.StringIO()
+        buf.write(f"Consensus: {max_count}/{len(valid_assessments)} models agreed. ")
+        for i, assessment in enumerate(valid_assessments):
+            if buf.tell() >= REASONING_MAX_LENGTH:
+                break
+            if i:
+                buf.write(" | ")
+            buf.write(f"[{assessment['model'].upper()}]: {assessment['reasoning']}")
+        final_reasoning = buf.getvalue()
         
         return CriticalityAssessment(
             company_name=company_name,
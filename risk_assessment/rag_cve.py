@@ -3,13 +3,27 @@ RAG (Retrieval Augmented Generation) for CVE Knowledge Base.
 Uses vector database for semantic search of CVE information.
 """
 
+import hashlib
 import os
-from typing import List, Dict, Optional
-from langchain_chroma import Chroma
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain.schema import Document
+import threading
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, List, Dict, Optional
 
-from .cve_client import CVEDatabaseClient
+from .cve_client import MAX_CONCURRENT_REQUESTS
+
+if TYPE_CHECKING:
+    from langchain_chroma import Chroma
+
+# Documents embedded and written per add_documents call
+EMBED_BATCH_SIZE = 100
+QUERY_CACHE_MAX_ENTRIES = 1024
+
+COLLECTION_NAME = "cve_knowledge"
+
+# Open vector stores keyed by (vector_db_dir, collection, embedding_model, API key hash)
+_VECTORSTORES: Dict[tuple, "Chroma"] = {}
+_VECTORSTORES_LOCK = threading.Lock()
 
 
 class CVEKnowledgeBase:
@@ -34,29 +48,54 @@ class CVEKnowledgeBase:
             vector_db_dir: Directory to store vector database
             embedding_model: Google embedding model to use
         """
+        # Heavy dependencies are imported on first use, not at module import
+        from langchain_chroma import Chroma
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        from langchain.embeddings import CacheBackedEmbeddings
+        from langchain.storage import LocalFileStore
+        
         self.google_api_key = google_api_key
         self.vector_db_dir = vector_db_dir
         self.embedding_model = embedding_model
         
-        # Initialize embeddings
-        self.embeddings = GoogleGenerativeAIEmbeddings(
+        # Initialize embeddings, cached on disk so repeated documents and
+        # queries don't trigger new embedding API calls
+        os.makedirs(vector_db_dir, exist_ok=True)
+        underlying_embeddings = GoogleGenerativeAIEmbeddings(
             model=embedding_model,
             google_api_key=google_api_key
         )
+        self.embeddings = CacheBackedEmbeddings.from_bytes_store(
+            underlying_embeddings,
+            LocalFileStore(os.path.join(vector_db_dir, "emb_cache")),
+            namespace=embedding_model,
+            query_embedding_cache=True
+        )
+        # In-memory memo of query vectors on top of the disk cache
+        self._embed_query = lru_cache(maxsize=QUERY_CACHE_MAX_ENTRIES)(self.embeddings.embed_query)
         
         # Initialize or load vector store
-        os.makedirs(vector_db_dir, exist_ok=True)
         
-        try:
-            self.vectorstore = Chroma(
-                persist_directory=vector_db_dir,
-                embedding_function=self.embeddings,
-                collection_name="cve_knowledge"
-            )
-            print(f"✅ CVE Knowledge Base loaded from {vector_db_dir}")
-        except Exception as e:
-            print(f"⚠️  Error loading vector store: {e}")
-            self.vectorstore = None
+        # One Chroma client per (directory, collection, model, credentials) for
+        # the process; the store's embedding function carries the API key
+        key_hash = hashlib.sha256((google_api_key or "").encode("utf-8")).hexdigest()
+        store_key = (os.path.abspath(vector_db_dir), COLLECTION_NAME, embedding_model, key_hash)
+        with _VECTORSTORES_LOCK:
+            self.vectorstore = _VECTORSTORES.get(store_key)
+            if self.vectorstore is not None:
+                return
+            
+            try:
+                self.vectorstore = Chroma(
+                    persist_directory=vector_db_dir,
+                    embedding_function=self.embeddings,
+                    collection_name=COLLECTION_NAME
+                )
+                _VECTORSTORES[store_key] = self.vectorstore
+                print(f"✅ CVE Knowledge Base loaded from {vector_db_dir}")
+            except Exception as e:
+                print(f"⚠️  Error loading vector store: {e}")
+                self.vectorstore = None
     
     def add_cves_to_knowledge_base(self, cves: List[Dict]) -> int:
         """
@@ -72,16 +111,17 @@ class CVEKnowledgeBase:
             print("⚠️  Vector store not initialized")
             return 0
         
-        documents = []
-        for cve in cves:
-            # Create document with CVE information
-            content = f"""CVE ID: {cve.get('cve_id', 'Unknown')}
-Severity: {cve.get('severity', 'unknown')}
-Description: {cve.get('description', '')}
-Published: {cve.get('published_date', 'Unknown')}"""
-            
-            doc = Document(
-                page_content=content,
+        from langchain.schema import Document
+        
+        # One-line content per CVE keeps embedding inputs compact
+        documents = [
+            Document(
+                page_content=(
+                    f"CVE ID: {cve.get('cve_id', 'Unknown')} | "
+                    f"Severity: {cve.get('severity', 'unknown')} | "
+                    f"Description: {cve.get('description', '')} | "
+                    f"Published: {cve.get('published_date', 'Unknown')}"
+                ),
                 metadata={
                     "cve_id": cve.get("cve_id", "Unknown"),
                     "severity": cve.get("severity", "unknown"),
@@ -89,10 +129,13 @@ Published: {cve.get('published_date', 'Unknown')}"""
                     "source_url": cve.get("source_url", "")
                 }
             )
-            documents.append(doc)
+            for cve in cves
+        ]
         
         if documents:
-            self.vectorstore.add_documents(documents)
+            # Bounded batches keep each embedding request a single round-trip
+            for i in range(0, len(documents), EMBED_BATCH_SIZE):
+                self.vectorstore.add_documents(documents[i:i + EMBED_BATCH_SIZE])
             print(f"✅ Added {len(documents)} CVEs to knowledge base")
             return len(documents)
         
@@ -120,8 +163,8 @@ Published: {cve.get('published_date', 'Unknown')}"""
         try:
             # Semantic search for relevant CVEs
             query = f"vulnerabilities security issues in {software_name}"
-            results = self.vectorstore.similarity_search(
-                query,
+            results = self.vectorstore.similarity_search_by_vector(
+                self._embed_query(query),
                 k=k
             )
             
@@ -145,7 +188,8 @@ Published: {cve.get('published_date', 'Unknown')}"""
     def build_knowledge_base_from_nvd(
         self,
         software_names: List[str],
-        days_back: int = 730
+        days_back: int = 730,
+        nvd_api_key: Optional[str] = None
     ) -> int:
         """
         Build knowledge base by fetching CVEs from NVD for multiple software.
@@ -153,17 +197,27 @@ Published: {cve.get('published_date', 'Unknown')}"""
         Args:
             software_names: List of software names to fetch CVEs for
             days_back: Number of days to look back
+            nvd_api_key: Optional NVD API key (default: NVD_API_KEY env var)
             
         Returns:
             Total number of CVEs added
         """
-        cve_client = CVEDatabaseClient()
+        from .clients import get_cve_client
+        
+        # The shared client's rate limiter throttles the concurrent fetches to
+        # NVD's limit, and counts against the same budget as the assessors
+        cve_client = get_cve_client(nvd_api_key or os.getenv("NVD_API_KEY"))
         total_added = 0
         
-        for software in software_names:
+        def fetch(software: str) -> Dict:
             print(f"Fetching CVEs for {software}...")
-            result = cve_client.search_cves(software, days_back=days_back)
-            
+            return cve_client.search_cves(software, days_back=days_back)
+        
+        # Fetch concurrently; Chroma writes stay on this thread
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            results = list(executor.map(fetch, software_names))
+        
+        for result in results:
             if result.get("cves"):
                 added = self.add_cves_to_knowledge_base(result["cves"])
                 total_added += added
@@ -0,0 +1,78 @@
+"""
+Embedding-based semantic cache for LLM responses.
+"""
+
+import math
+import threading
+from typing import Any, List, Optional, Tuple
+
+
+class SemanticCache:
+    """
+    In-memory semantic cache keyed by embedding vectors.
+
+    Entries are matched by cosine similarity, so near-duplicate keys
+    (e.g. "Citi" vs "Citibank") can reuse a previously computed value.
+    """
+
+    def __init__(self, threshold: float = 0.92, max_entries: int = 1024):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            threshold: Minimum cosine similarity for a lookup to count as a hit
+            max_entries: Maximum number of entries before the oldest is evicted
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._vectors: List[List[float]] = []
+        self._values: List[Any] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @staticmethod
+    def normalize(vector: List[float]) -> List[float]:
+        """Scale a vector to unit length so dot products are cosine similarities."""
+        norm = math.sqrt(sum(x * x for x in vector))
+        if norm == 0:
+            return list(vector)
+        return [x / norm for x in vector]
+
+    def lookup(self, vector: List[float]) -> Tuple[Optional[Any], float]:
+        """
+        Find the most similar cached entry.
+
+        Args:
+            vector: Normalized query embedding
+
+        Returns:
+            Tuple of (cached value or None, best similarity score)
+        """
+        best_score = 0.0
+        best_value = None
+
+        with self._lock:
+            for stored, value in zip(self._vectors, self._values):
+                score = sum(a * b for a, b in zip(vector, stored))
+                if score > best_score:
+                    best_score, best_value = score, value
+
+            if best_value is not None and best_score >= self.threshold:
+                self.hits += 1
+                return best_value, best_score
+
+            self.misses += 1
+            return None, best_score
+
+    def add(self, vector: List[float], value: Any) -> None:
+        """Store a value under a normalized embedding, evicting the oldest entry if full."""
+        with self._lock:
+            self._vectors.append(vector)
+            self._values.append(value)
+            if len(self._values) > self.max_entries:
+                self._vectors.pop(0)
+                self._values.pop(0)
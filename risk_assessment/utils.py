@@ -2,8 +2,18 @@
 Utility functions for the risk assessment workflow.
 """
 
+import os
+import time
+import hashlib
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Hashable, Optional, Sequence
+
+import orjson
+
+logger = logging.getLogger(__name__)
 
 
 def setup_logging(level: str = "INFO") -> logging.Logger:
@@ -24,58 +34,365 @@ def setup_logging(level: str = "INFO") -> logging.Logger:
     return logging.getLogger("risk_assessment")
 
 
+# USD per 1M tokens by model
+GEMINI_PRICING = {
+    "gemini-2.0-flash-exp": {
+        "input_per_1m": 0.075,
+        "output_per_1m": 0.30
+    },
+    "gemini-1.5-flash": {
+        "input_per_1m": 0.075,
+        "output_per_1m": 0.30
+    }
+}
+
+# Context-cached input tokens are billed at this fraction of the input rate
+CACHED_INPUT_RATE_FACTOR = 0.25
+
+# Per-token (input, cached input, output) rates, precomputed from GEMINI_PRICING
+_RATES = {
+    model: (
+        rates["input_per_1m"] / 1_000_000,
+        rates["input_per_1m"] / 1_000_000 * CACHED_INPUT_RATE_FACTOR,
+        rates["output_per_1m"] / 1_000_000
+    )
+    for model, rates in GEMINI_PRICING.items()
+}
+
+
 def calculate_cost(
     input_tokens: int,
     output_tokens: int,
-    model: str = "gemini-2.0-flash-exp"
+    model: str = "gemini-2.0-flash-exp",
+    cached_tokens: int = 0,
+    detailed: bool = False
 ) -> dict:
     """
     Calculate estimated API cost based on token usage.
     
     Pricing (as of 2025):
     - Gemini 2.0 Flash: Free tier up to rate limits, then $0.075/1M input, $0.30/1M output
+    - Cached input tokens: 0.25x the input rate
     - Tavily: Free tier 1000 searches/month
     
     Args:
-        input_tokens: Number of input tokens
+        input_tokens: Number of input tokens (including cached tokens)
         output_tokens: Number of output tokens
         model: Model name
+        cached_tokens: Number of input tokens served from Gemini's context cache
+        detailed: Whether to include a per-category cost breakdown
         
     Returns:
-        Dict with cost breakdown
-    """
-    pricing = {
-        "gemini-2.0-flash-exp": {
-            "input_per_1m": 0.075,
-            "output_per_1m": 0.30
-        },
-        "gemini-1.5-flash": {
-            "input_per_1m": 0.075,
-            "output_per_1m": 0.30
-        }
-    }
-    
-    if model not in pricing:
+        Dict with token counts and estimated cost
+    """
+    rates = _RATES.get(model)
+    if rates is None:
         return {
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
+            "cached_tokens": cached_tokens,
             "total_tokens": input_tokens + output_tokens,
             "estimated_cost_usd": 0.0,
             "note": f"Pricing not available for {model}"
         }
     
-    rates = pricing[model]
-    input_cost = (input_tokens / 1_000_000) * rates["input_per_1m"]
-    output_cost = (output_tokens / 1_000_000) * rates["output_per_1m"]
+    in_rate, cached_rate, out_rate = rates
+    cached_tokens = min(cached_tokens, input_tokens)
+    input_cost = (input_tokens - cached_tokens) * in_rate
+    cached_cost = cached_tokens * cached_rate
+    output_cost = output_tokens * out_rate
     
-    return {
+    cost = {
         "input_tokens": input_tokens,
         "output_tokens": output_tokens,
+        "cached_tokens": cached_tokens,
         "total_tokens": input_tokens + output_tokens,
-        "estimated_cost_usd": round(input_cost + output_cost, 6),
-        "cost_breakdown": {
+        "estimated_cost_usd": round(input_cost + cached_cost + output_cost, 6)
+    }
+    if detailed:
+        cost["cost_breakdown"] = {
             "input": round(input_cost, 6),
+            "cached_input": round(cached_cost, 6),
             "output": round(output_cost, 6)
         }
+    return cost
+
+
+def calculate_costs_batch(
+    input_tokens: Sequence[int],
+    output_tokens: Sequence[int],
+    model: str = "gemini-2.0-flash-exp",
+    cached_tokens: Optional[Sequence[int]] = None
+) -> dict:
+    """
+    Calculate estimated costs for many requests at once.
+    
+    Rates are looked up once and applied per request; since cost is linear in
+    tokens, the aggregate is computed from token totals.
+    
+    Args:
+        input_tokens: Input tokens per request (including cached tokens)
+        output_tokens: Output tokens per request
+        model: Model name
+        cached_tokens: Cached input tokens per request (defaults to none)
+        
+    Returns:
+        Dict with per-request costs and aggregate totals
+    """
+    if cached_tokens is None:
+        cached_tokens = [0] * len(input_tokens)
+    # Cached tokens are a subset of input tokens, as in calculate_cost
+    cached_tokens = [min(c, i) for i, c in zip(input_tokens, cached_tokens)]
+    
+    rates = _RATES.get(model)
+    in_rate, cached_rate, out_rate = rates or (0.0, 0.0, 0.0)
+    
+    per_request = [
+        round((i - c) * in_rate + c * cached_rate + o * out_rate, 6)
+        for i, o, c in zip(input_tokens, output_tokens, cached_tokens)
+    ]
+    total_input = sum(input_tokens)
+    total_output = sum(output_tokens)
+    total_cached = sum(cached_tokens)
+    
+    costs = {
+        "per_request_usd": per_request,
+        "input_tokens": total_input,
+        "output_tokens": total_output,
+        "cached_tokens": total_cached,
+        "total_tokens": total_input + total_output,
+        "estimated_cost_usd": round(
+            (total_input - total_cached) * in_rate + total_cached * cached_rate + total_output * out_rate, 6
+        )
     }
+    if rates is None:
+        costs["note"] = f"Pricing not available for {model}"
+    return costs
+
+
+def get_token_usage(response: Any) -> Optional[tuple]:
+    """
+    Read token usage from a LangChain chat model response.
+    
+    Args:
+        response: AIMessage returned by the LLM (or None)
+        
+    Returns:
+        Tuple of (input_tokens, output_tokens, cached_tokens), or None if unavailable
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        return usage.get("input_tokens", 0), usage.get("output_tokens", 0), cached or 0
+    
+    metadata = getattr(response, "response_metadata", None) or {}
+    if "token_usage" in metadata:
+        token_usage = metadata["token_usage"]
+        return (
+            token_usage.get("prompt_tokens", 0),
+            token_usage.get("completion_tokens", 0),
+            token_usage.get("cached_content_token_count", 0)
+        )
+    return None
+
+
+def trace_error(error: Optional[str]) -> dict:
+    """
+    Trace fields recording a failed step.
+    
+    Returns:
+        {"error": error} if the step failed, otherwise an empty dict
+    """
+    return {"error": error} if error else {}
+
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache with a per-entry time-to-live."""
+    
+    def __init__(self, ttl_seconds: float, max_entries: int = 256):
+        """
+        Initialize the cache.
+        
+        Args:
+            ttl_seconds: How long an entry stays valid after being set
+            max_entries: Maximum number of entries before the least recently used is evicted
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Remove all entries and reset hit/miss counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+class RateLimiter:
+    """
+    Thread-safe rolling-window rate limiter.
+    
+    At most max_calls acquisitions are allowed in any window of period
+    seconds; acquire() blocks until a slot frees up.
+    """
+    
+    def __init__(self, max_calls: int, period: float):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            max_calls: Maximum calls allowed per window
+            period: Window length in seconds
+        """
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until a call is allowed, then record it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and self._calls[0] <= now - self.period:
+                    self._calls.popleft()
+                if len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+                wait = self._calls[0] + self.period - now
+            # Sleep outside the lock so other threads can check the window
+            time.sleep(wait)
+
+
+class SearchCache:
+    """
+    Tavily search results shared by every assessor in a workflow.
+    
+    The vulnerability and criticality assessors search the web for the same
+    software, so sharing one cache lets identical queries hit the network once.
+    """
+    
+    def __init__(self, client: Any, ttl_seconds: float = 86400, max_entries: int = 512):
+        """
+        Initialize the search cache.
+        
+        Args:
+            client: Tavily client used on a cache miss
+            ttl_seconds: How long search results stay valid
+            max_entries: Maximum number of cached queries
+        """
+        self.client = client
+        self._cache = TTLCache(ttl_seconds, max_entries)
+    
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+    
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+    
+    @staticmethod
+    def make_key(query: str, max_results: int, search_depth: str) -> tuple:
+        """Build a cache key from the normalized query and search parameters."""
+        return (" ".join(query.lower().split()), max_results, search_depth)
+    
+    def search(self, query: str, max_results: int, search_depth: str = "basic") -> tuple:
+        """
+        Run a Tavily search, serving repeated queries from the cache.
+        
+        Returns:
+            Tuple of (Tavily response, cache_hit)
+        """
+        key = self.make_key(query, max_results, search_depth)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached, True
+        
+        results = self.client.search(
+            query=query,
+            max_results=max_results,
+            search_depth=search_depth
+        )
+        self._cache.set(key, results)
+        return results, False
+
 
+class NVDCache:
+    """
+    On-disk cache of NVD responses keyed by a normalized request key.
+    
+    Entries survive across processes, so repeated and batch assessments don't
+    spend NVD's rate limit on data that rarely changes. Keys should include
+    every request parameter that affects the response.
+    """
+    
+    def __init__(self, cache_dir: str = ".cache/nvd", ttl_seconds: float = 24 * 60 * 60):
+        """
+        Initialize the cache.
+        
+        Args:
+            cache_dir: Directory holding cached responses
+            ttl_seconds: How long a fetched response stays valid
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+    
+    def _path(self, key: str) -> Path:
+        normalized = " ".join(key.lower().split())
+        return self.cache_dir / f"{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}.json"
+    
+    def get(self, key: str) -> Optional[dict]:
+        """Return the cached response, or None if missing, expired or unreadable."""
+        try:
+            entry = orjson.loads(self._path(key).read_bytes())
+            if time.time() - entry["fetched_at"] <= self.ttl_seconds:
+                self.hits += 1
+                return entry["response"]
+        except FileNotFoundError:
+            pass
+        except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable NVD cache entry for %s: %s", key, e)
+        self.misses += 1
+        return None
+    
+    def set(self, key: str, response: dict) -> None:
+        """Store a response, replacing any existing entry atomically."""
+        path = self._path(key)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(orjson.dumps({"fetched_at": time.time(), "response": response}))
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            logger.warning("Failed to cache NVD response for %s: %s", key, e)
@@ -5,19 +5,19 @@ Vulnerability assessment module for checking CVEs and security issues.
 import json
 import re
 import time
+import asyncio
 import logging
 from typing import List, Optional
-from tavily import TavilyClient
-from langchain_google_genai import ChatGoogleGenerativeAI
 
+from .clients import get_search_cache, get_gemini_llm, get_cve_client
 from .models import Vulnerability, VulnerabilityAssessment, Severity
-from .cve_client import CVEDatabaseClient
-from .utils import calculate_cost
+from .utils import calculate_cost, get_token_usage, SearchCache, trace_error
 
 logger = logging.getLogger(__name__)
 
 DESCRIPTION_MAX_LENGTH = 200
 
+
 def parse_severity_from_cvss(cvss_score: float) -> Severity:
     """
     Parse severity from CVSS score (NIST standard).
@@ -82,7 +82,8 @@ class VulnerabilityAssessor:
         tavily_api_key: str, 
         google_api_key: str,
         nvd_api_key: Optional[str] = None,
-        use_nvd: bool = True
+        use_nvd: bool = True,
+        search_cache: Optional[SearchCache] = None
     ):
         """
         Initialize the vulnerability assessor.
@@ -92,15 +93,14 @@ class VulnerabilityAssessor:
             google_api_key: Google API key for Gemini
             nvd_api_key: Optional NVD API key for higher rate limits
             use_nvd: Whether to use NVD API as primary source
+            search_cache: Search cache to share with other assessors
+                (default: the process-wide cache for this API key)
         """
-        self.tavily_client = TavilyClient(api_key=tavily_api_key)
-        self.cve_client = CVEDatabaseClient(api_key=nvd_api_key)
+        self.search_cache = search_cache or get_search_cache(tavily_api_key)
+        self.cve_client = get_cve_client(nvd_api_key)
         self.use_nvd = use_nvd
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash-exp",
-            google_api_key=google_api_key,
-            temperature=0  # Deterministic output for consistent results
-        )
+        # Temperature 0: deterministic output for consistent results
+        self.llm = get_gemini_llm("gemini-2.0-flash-exp", google_api_key, 0)
     
     def verify_software_exists(self, software_name: str) -> dict:
         """Verify if software exists and is real using web search."""
@@ -109,8 +109,8 @@ class VulnerabilityAssessor:
         query = f'"{software_name}" software tool product'
         
         try:
-            results = self.tavily_client.search(
-                query=query,
+            results, cache_hit = self.search_cache.search(
+                query,
                 max_results=3,
                 search_depth="basic"
             )
@@ -152,7 +152,8 @@ class VulnerabilityAssessor:
                 "exists": software_found,  # Only true if name was found in results
                 "confidence": confidence,
                 "evidence_urls": evidence,
-                "elapsed_time": elapsed
+                "elapsed_time": elapsed,
+                "cache_hit": cache_hit
             }
             
         except Exception as e:
@@ -174,8 +175,8 @@ class VulnerabilityAssessor:
         query = f"CVE vulnerabilities security issues {software_name}"
         
         try:
-            results = self.tavily_client.search(
-                query=query,
+            results, cache_hit = self.search_cache.search(
+                query,
                 max_results=5,
                 search_depth="advanced"
             )
@@ -185,7 +186,8 @@ class VulnerabilityAssessor:
             return {
                 "results": results.get("results", []),
                 "query": query,
-                "elapsed_time": elapsed
+                "elapsed_time": elapsed,
+                "cache_hit": cache_hit
             }
         except Exception as e:
             logger.error("Error searching CVEs: %s", e)
@@ -197,7 +199,13 @@ class VulnerabilityAssessor:
             }
     
     def analyze_vulnerabilities(self, software_name: str, search_results: List[dict]) -> VulnerabilityAssessment:
-        """Analyze search results to extract vulnerability information using LLM."""
+        """
+        Analyze search results to extract vulnerability information using LLM.
+        
+        Returns:
+            Tuple of (VulnerabilityAssessment, analysis, elapsed_time, cost_info, error),
+            where error is None unless the analysis failed
+        """
         start_time = time.time()
         
         # Prepare context from search results with numbered sources
@@ -261,11 +269,12 @@ IMPORTANT:
             
             # Extract token usage and calculate cost
             cost_info = {}
-            if hasattr(response, 'response_metadata') and 'token_usage' in response.response_metadata:
-                token_usage = response.response_metadata['token_usage']
-                input_tokens = token_usage.get('prompt_tokens', 0)
-                output_tokens = token_usage.get('completion_tokens', 0)
-                cost_info = calculate_cost(input_tokens, output_tokens, "gemini-2.0-flash-exp")
+            token_usage = get_token_usage(response)
+            if token_usage:
+                input_tokens, output_tokens, cached_tokens = token_usage
+                cost_info = calculate_cost(
+                    input_tokens, output_tokens, "gemini-2.0-flash-exp", cached_tokens, detailed=True
+                )
             
             # Parse JSON response with fallback
             try:
@@ -416,14 +425,14 @@ IMPORTANT:
                 source_data=source_data,
                 software_exists=True,  # Will be updated by assess() method
                 existence_confidence="unknown"  # Will be updated by assess() method
-            ), analysis, elapsed, cost_info
+            ), analysis, elapsed, cost_info, None
             
         except Exception as e:
             logger.error("Error analyzing vulnerabilities: %s", e)
             return VulnerabilityAssessment(
                 software_name=software_name,
                 summary=f"Error analyzing vulnerabilities: {str(e)}"
-            ), str(e), time.time() - start_time, {}
+            ), str(e), time.time() - start_time, {}, str(e)
     
     def _parse_vulnerabilities_from_analysis(self, analysis: str) -> List[Vulnerability]:
         """Parse vulnerability information from LLM analysis (fallback method)."""
@@ -470,7 +479,7 @@ IMPORTANT:
         return vulnerabilities
     
     def search_cves_nvd(self, software_name: str) -> dict:
-        """Search for CVEs using NVD API directly."""
+        """Search for CVEs using NVD API directly (cached by the NVD client)."""
         return self.cve_client.search_cves(software_name)
     
     def assess(self, software_name: str) -> tuple:
@@ -483,18 +492,57 @@ IMPORTANT:
         Returns:
             Tuple of (VulnerabilityAssessment, traces)
         """
-        traces = []
-        
         # Step 0: Verify software exists
         logger.info("Verifying '%s' exists", software_name)
         existence_check = self.verify_software_exists(software_name)
+        nvd_result = self.search_cves_nvd(software_name) if self.use_nvd else None
+        
+        return self._assess_from_sources(software_name, existence_check, nvd_result)
+    
+    async def aassess(self, software_name: str) -> tuple:
+        """
+        Async variant of assess() for use on an event loop.
+        
+        The existence check and the NVD lookup are independent, so they run
+        concurrently; blocking SDK calls run in worker threads.
+        
+        Returns:
+            Tuple of (VulnerabilityAssessment, traces)
+        """
+        logger.info("Verifying '%s' exists", software_name)
+        verification = asyncio.to_thread(self.verify_software_exists, software_name)
+        if self.use_nvd:
+            existence_check, nvd_result = await asyncio.gather(
+                verification,
+                asyncio.to_thread(self.search_cves_nvd, software_name)
+            )
+        else:
+            existence_check, nvd_result = await verification, None
+        
+        return await asyncio.to_thread(
+            self._assess_from_sources, software_name, existence_check, nvd_result
+        )
+    
+    def _assess_from_sources(self, software_name: str, existence_check: dict,
+                             nvd_result: Optional[dict]) -> tuple:
+        """
+        Analyze vulnerabilities given the existence check and NVD result.
+        
+        Falls back to Tavily web search when NVD is disabled or returned nothing.
+        
+        Returns:
+            Tuple of (VulnerabilityAssessment, traces)
+        """
+        traces = []
         traces.append({
             "step": "software_verification",
             "tool": "tavily",
             "query": f'"{software_name}" software tool product',
             "elapsed_time": existence_check.get("elapsed_time"),
             "confidence": existence_check.get("confidence"),
-            "exists": existence_check.get("exists")
+            "exists": existence_check.get("exists"),
+            "cache_hit": existence_check.get("cache_hit", False),
+            **trace_error(existence_check.get("error"))
         })
         
         exists = existence_check.get("exists", False)
@@ -512,15 +560,18 @@ IMPORTANT:
             logger.warning("Software verification uncertain for '%s'", software_name)
         
         # Try NVD API first
-        if self.use_nvd:
-            nvd_result = self.search_cves_nvd(software_name)
+        if nvd_result is not None:
             traces.append({
                 "step": "cve_search_nvd",
                 "tool": "nvd_api",
                 "query": nvd_result.get("query"),
                 "elapsed_time": nvd_result.get("elapsed_time"),
                 "results_count": nvd_result.get("total_results", 0),
-                "source": "authoritative"
+                "source": "authoritative",
+                "cache_hit": nvd_result.get("source") == "nvd_cache",
+                "cache_tier": nvd_result.get("cache_tier"),
+                "nvd_cache": self.cve_client.cache_stats(),
+                **trace_error(nvd_result.get("error"))
             })
             
             # If NVD found results, use them
@@ -555,11 +606,13 @@ IMPORTANT:
             "query": search_result.get("query"),
             "elapsed_time": search_result.get("elapsed_time"),
             "results_count": len(search_result.get("results", [])),
-            "source": "web_search"
+            "source": "web_search",
+            "cache_hit": search_result.get("cache_hit", False),
+            **trace_error(search_result.get("error"))
         })
         
         # Analyze vulnerabilities from web search
-        assessment, _, elapsed, cost_info = self.analyze_vulnerabilities(
+        assessment, _, elapsed, cost_info, error = self.analyze_vulnerabilities(
             software_name,
             search_result.get("results", [])
         )
@@ -573,7 +626,8 @@ IMPORTANT:
             "tool": "gemini",
             "elapsed_time": elapsed,
             "vulnerabilities_found": assessment.total_count,
-            "data_source": "tavily"
+            "data_source": "tavily",
+            **trace_error(error)
         }
         if cost_info:
             trace_data["cost"] = cost_info
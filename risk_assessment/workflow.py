@@ -3,11 +3,17 @@ LangGraph workflow for risk assessment.
 """
 
 import os
+import asyncio
 import logging
-from typing import TypedDict
-from langgraph.graph import StateGraph, END
+import operator
+from typing import Annotated, List, Optional, Tuple
+from functools import lru_cache
+from pydantic import BaseModel, ConfigDict, Field
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph import StateGraph, START, END
 
-from .models import RiskAssessmentOutput
+from .clients import get_search_cache
+from .models import Decision, RiskAssessmentOutput, VulnerabilityAssessment, CriticalityAssessment
 from .vulnerability_assessment import VulnerabilityAssessor
 from .criticality_assessment import CriticalityAssessor
 from .decision_policy import make_decision, generate_final_summary
@@ -15,16 +21,60 @@ from .decision_policy import make_decision, generate_final_summary
 logger = logging.getLogger(__name__)
 
 
-class WorkflowState(TypedDict):
-    """State for the LangGraph workflow."""
+class WorkflowState(BaseModel):
+    """
+    State for the LangGraph workflow.
+    
+    Nodes never mutate the state; they return patches with only the fields
+    they write, which LangGraph merges into the next state.
+    """
+    model_config = ConfigDict(frozen=False, arbitrary_types_allowed=True)
+    
     company_name: str
     software_name: str
-    vulnerability_assessment: dict
-    criticality_assessment: dict
-    decision: str
-    decision_reasoning: str
-    final_summary: str
-    traces: list
+    # Assessments stay model objects between nodes; they are only
+    # serialized at the output boundary
+    vulnerability_assessment: Optional[VulnerabilityAssessment] = None
+    criticality_assessment: Optional[CriticalityAssessment] = None
+    decision: str = ""
+    decision_reasoning: str = ""
+    final_summary: str = ""
+    # Parallel nodes each append their traces; the reducer concatenates them
+    traces: Annotated[list, operator.add] = Field(default_factory=list)
+
+
+# Graph nodes delegate to the RiskAssessmentWorkflow passed in the run config,
+# so one compiled graph serves every instance (and every set of API keys)
+async def _assess_vulnerabilities_node(state: WorkflowState, config: RunnableConfig) -> dict:
+    return await config["configurable"]["workflow"]._assess_vulnerabilities(state)
+
+
+async def _assess_criticality_node(state: WorkflowState, config: RunnableConfig) -> dict:
+    return await config["configurable"]["workflow"]._assess_criticality(state)
+
+
+def _make_decision_node(state: WorkflowState, config: RunnableConfig) -> dict:
+    return config["configurable"]["workflow"]._make_decision(state)
+
+
+@lru_cache(maxsize=1)
+def _get_compiled_graph():
+    """Build and compile the LangGraph workflow once per process."""
+    workflow = StateGraph(WorkflowState)
+    
+    # Add nodes
+    workflow.add_node("assess_vulnerabilities", _assess_vulnerabilities_node)
+    workflow.add_node("assess_criticality", _assess_criticality_node)
+    workflow.add_node("make_decision", _make_decision_node)
+    
+    # Define edges: both assessments are independent, so fan out from
+    # the start and join before the decision
+    workflow.add_edge(START, "assess_vulnerabilities")
+    workflow.add_edge(START, "assess_criticality")
+    workflow.add_edge(["assess_vulnerabilities", "assess_criticality"], "make_decision")
+    workflow.add_edge("make_decision", END)
+    
+    return workflow.compile()
 
 
 class RiskAssessmentWorkflow:
@@ -35,9 +85,20 @@ class RiskAssessmentWorkflow:
         tavily_api_key: str = None, 
         google_api_key: str = None,
         nvd_api_key: str = None,
-        use_nvd: bool = True
+        use_nvd: bool = True,
+        use_semantic_cache: bool = False
     ):
-        """Initialize the workflow."""
+        """
+        Initialize the workflow.
+        
+        Args:
+            tavily_api_key: Tavily API key (default: TAVILY_API_KEY)
+            google_api_key: Google API key (default: GOOGLE_API_KEY)
+            nvd_api_key: Optional NVD API key (default: NVD_API_KEY)
+            use_nvd: Query NVD before falling back to web search
+            use_semantic_cache: Reuse criticality analyses for near-duplicate
+                company names assessing the same software
+        """
         self.tavily_api_key = tavily_api_key or os.getenv("TAVILY_API_KEY")
         self.google_api_key = google_api_key or os.getenv("GOOGLE_API_KEY")
         self.nvd_api_key = nvd_api_key or os.getenv("NVD_API_KEY")
@@ -47,58 +108,60 @@ class RiskAssessmentWorkflow:
         if not self.google_api_key:
             raise ValueError("GOOGLE_API_KEY is required")
         
+        # Both assessors search for the same software, so they share one search cache
+        search_cache = get_search_cache(self.tavily_api_key)
         self.vuln_assessor = VulnerabilityAssessor(
             tavily_api_key=self.tavily_api_key,
             google_api_key=self.google_api_key,
             nvd_api_key=self.nvd_api_key,
-            use_nvd=use_nvd
+            use_nvd=use_nvd,
+            search_cache=search_cache
         )
         self.crit_assessor = CriticalityAssessor(
             tavily_api_key=self.tavily_api_key,
-            google_api_key=self.google_api_key
+            google_api_key=self.google_api_key,
+            use_semantic_cache=use_semantic_cache,
+            search_cache=search_cache
         )
         
-        self.graph = self._build_graph()
+        # Topology is static, so the compiled graph is shared by all instances
+        self.graph = _get_compiled_graph()
     
-    def _assess_vulnerabilities(self, state: WorkflowState) -> WorkflowState:
-        """Node: Assess vulnerabilities."""
-        logger.info("Assessing vulnerabilities for %s", state['software_name'])
-        
-        assessment, traces = self.vuln_assessor.assess(state["software_name"])
+    async def _assess_vulnerabilities(self, state: WorkflowState) -> dict:
+        """Node: Assess vulnerabilities (runs in parallel with criticality)."""
+        logger.info("Assessing vulnerabilities for %s", state.software_name)
         
-        state["vulnerability_assessment"] = assessment.model_dump()
-        state["traces"].extend(traces)
+        assessment, traces = await self.vuln_assessor.aassess(state.software_name)
         
-        return state
+        # Return only the keys this node writes so parallel updates don't collide
+        return {
+            "vulnerability_assessment": assessment,
+            "traces": traces
+        }
     
-    def _assess_criticality(self, state: WorkflowState) -> WorkflowState:
-        """Node: Assess business criticality."""
-        logger.info("Assessing business criticality for %s", state['company_name'])
+    async def _assess_criticality(self, state: WorkflowState) -> dict:
+        """Node: Assess business criticality (runs in parallel with vulnerabilities)."""
+        logger.info("Assessing business criticality for %s", state.company_name)
         
-        assessment, traces = self.crit_assessor.assess(
-            state["company_name"],
-            state["software_name"]
+        assessment, traces = await self.crit_assessor.aassess(
+            state.company_name,
+            state.software_name
         )
         
-        state["criticality_assessment"] = assessment.model_dump()
-        state["traces"].extend(traces)
-        
-        return state
+        return {
+            "criticality_assessment": assessment,
+            "traces": traces
+        }
     
-    def _make_decision(self, state: WorkflowState) -> WorkflowState:
+    def _make_decision(self, state: WorkflowState) -> dict:
         """Node: Make approve/decline decision."""
         logger.info("Making decision based on policy")
         
-        from .models import VulnerabilityAssessment, CriticalityAssessment
-        
-        vuln_assessment = VulnerabilityAssessment(**state["vulnerability_assessment"])
-        crit_assessment = CriticalityAssessment(**state["criticality_assessment"])
+        vuln_assessment = state.vulnerability_assessment
+        crit_assessment = state.criticality_assessment
         
         decision, reasoning = make_decision(vuln_assessment, crit_assessment)
         
-        state["decision"] = decision.value
-        state["decision_reasoning"] = reasoning
-        
         # Generate final summary
         final_summary = generate_final_summary(
             decision,
@@ -106,26 +169,12 @@ class RiskAssessmentWorkflow:
             vuln_assessment,
             crit_assessment
         )
-        state["final_summary"] = final_summary
-        
-        return state
-    
-    def _build_graph(self) -> StateGraph:
-        """Build the LangGraph workflow."""
-        workflow = StateGraph(WorkflowState)
         
-        # Add nodes
-        workflow.add_node("assess_vulnerabilities", self._assess_vulnerabilities)
-        workflow.add_node("assess_criticality", self._assess_criticality)
-        workflow.add_node("make_decision", self._make_decision)
-        
-        # Define edges
-        workflow.set_entry_point("assess_vulnerabilities")
-        workflow.add_edge("assess_vulnerabilities", "assess_criticality")
-        workflow.add_edge("assess_criticality", "make_decision")
-        workflow.add_edge("make_decision", END)
-        
-        return workflow.compile()
+        return {
+            "decision": decision.value,
+            "decision_reasoning": reasoning,
+            "final_summary": final_summary
+        }
     
     def run(self, company_name: str, software_name: str) -> RiskAssessmentOutput:
         """
@@ -137,33 +186,93 @@ class RiskAssessmentWorkflow:
             
         Returns:
             RiskAssessmentOutput with the final decision and summary
+            
+        Raises:
+            RuntimeError: If called from inside a running event loop
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop running; safe to start one for the async nodes
+            return asyncio.run(self.arun(company_name, software_name))
+        raise RuntimeError(
+            "RiskAssessmentWorkflow.run() cannot be called from a running event loop; "
+            "use 'await workflow.arun(...)' instead"
+        )
+    
+    async def arun(self, company_name: str, software_name: str) -> RiskAssessmentOutput:
         """
+        Run the risk assessment workflow on the running event loop.
+        
+        Args:
+            company_name: Name of the company
+            software_name: Name of the software
+            
+        Returns:
+            RiskAssessmentOutput with the final decision and summary
+        """
+        final_state = await self.graph.ainvoke(
+            self._initial_state(company_name, software_name),
+            config=self._graph_config()
+        )
+        return self._to_output(final_state)
+    
+    async def arun_many(
+        self,
+        pairs: List[Tuple[str, str]],
+        max_concurrency: int = 8,
+        batch_size: Optional[int] = None,
+        delay_between_batches: float = 0.0
+    ) -> List[RiskAssessmentOutput]:
+        """
+        Run the workflow for many (company, software) pairs concurrently.
+        
+        Args:
+            pairs: (company_name, software_name) pairs to assess
+            max_concurrency: Maximum assessments in flight at once
+            batch_size: Pairs submitted per abatch call (default: all at once)
+            delay_between_batches: Seconds to wait between batches, to stay
+                under provider rate limits
+            
+        Returns:
+            RiskAssessmentOutput per pair, in input order
+        """
+        config = {**self._graph_config(), "max_concurrency": max_concurrency}
+        batch_size = batch_size or max(len(pairs), 1)
+        
+        outputs = []
+        for start in range(0, len(pairs), batch_size):
+            if start and delay_between_batches:
+                await asyncio.sleep(delay_between_batches)
+            states = [
+                self._initial_state(company_name, software_name)
+                for company_name, software_name in pairs[start:start + batch_size]
+            ]
+            final_states = await self.graph.abatch(states, config=config)
+            outputs.extend(self._to_output(final_state) for final_state in final_states)
+        
+        return outputs
+    
+    def _graph_config(self) -> RunnableConfig:
+        """Config that routes the shared graph's nodes to this instance."""
+        return {"configurable": {"workflow": self}}
+    
+    def _initial_state(self, company_name: str, software_name: str) -> WorkflowState:
+        """Log the start of an assessment and build the initial graph state."""
         logger.info("="*80)
         logger.info("Starting Risk Assessment")
         logger.info("Company: %s", company_name)
         logger.info("Software: %s", software_name)
         logger.info("="*80)
         
-        # Initialize state
-        initial_state = {
-            "company_name": company_name,
-            "software_name": software_name,
-            "vulnerability_assessment": {},
-            "criticality_assessment": {},
-            "decision": "",
-            "decision_reasoning": "",
-            "final_summary": "",
-            "traces": []
-        }
-        
-        # Run the workflow
-        final_state = self.graph.invoke(initial_state)
-        
-        # Convert to output model
-        from .models import Decision, VulnerabilityAssessment, CriticalityAssessment
-        
-        vuln_assessment = VulnerabilityAssessment(**final_state["vulnerability_assessment"])
-        crit_assessment = CriticalityAssessment(**final_state["criticality_assessment"])
+        return WorkflowState(company_name=company_name, software_name=software_name)
+    
+    def _to_output(self, final_state: dict) -> RiskAssessmentOutput:
+        """Convert the final graph state (returned as a dict of fields) to the output model."""
+        company_name = final_state["company_name"]
+        software_name = final_state["software_name"]
+        vuln_assessment = final_state["vulnerability_assessment"]
+        crit_assessment = final_state["criticality_assessment"]
         
         output = RiskAssessmentOutput(
             company_name=company_name,
@@ -192,16 +301,25 @@ class RiskAssessmentWorkflow:
         
         return output
     
-    def visualize(self, output_path: str = "viz/graph.png"):
+    def visualize(self, output_path: str = "viz/graph.png", force: bool = False):
         """
         Visualize the workflow graph.
         
+        The topology only changes with this module, so an existing PNG newer
+        than workflow.py is reused instead of being rendered again.
+        
         Args:
             output_path: Path to save the visualization
+            force: Re-render even if an up-to-date PNG exists
         """
         try:
             from IPython.display import Image
-            img = Image(self.graph.get_graph().draw_mermaid_png())
+            
+            if not force and _is_up_to_date(output_path):
+                logger.info("Reusing graph visualization at %s", output_path)
+                return Image(filename=output_path)
+            
+            img = Image(self._render_graph_png())
             
             # Create directory if it doesn't exist
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -216,4 +334,23 @@ class RiskAssessmentWorkflow:
             logger.warning("Could not generate graph visualization: %s", e)
             logger.info("Graph visualization is optional and doesn't affect functionality")
             return None
+    
+    def _render_graph_png(self) -> bytes:
+        """Render the graph locally with pyppeteer, falling back to the mermaid.ink API."""
+        from langchain_core.runnables.graph import MermaidDrawMethod
+        
+        graph = self.graph.get_graph()
+        try:
+            return graph.draw_mermaid_png(draw_method=MermaidDrawMethod.PYPPETEER)
+        except Exception as e:
+            # Not installed, or Chromium failed to download, launch or render in time
+            logger.info("Local graph rendering failed (%s); using the mermaid.ink API", e)
+            return graph.draw_mermaid_png(draw_method=MermaidDrawMethod.API)
+
 
+def _is_up_to_date(output_path: str) -> bool:
+    """Check whether a rendered graph exists and is newer than this module."""
+    try:
+        return os.path.getmtime(output_path) >= os.path.getmtime(__file__)
+    except OSError:
+        return False
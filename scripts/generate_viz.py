@@ -5,6 +5,7 @@ Creates a visual representation of the LangGraph workflow.
 """
 
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,14 +16,14 @@ if not os.getenv("TAVILY_API_KEY"):
 if not os.getenv("GOOGLE_API_KEY"):
     os.environ["GOOGLE_API_KEY"] = "dummy_key_for_viz"
 
-def create_mermaid_diagram():
-    """Create a Mermaid diagram of the workflow."""
-    mermaid = """# Workflow Graph Visualization
+# Diagram contents are fixed, so they are encoded once at import
+_MERMAID_BYTES = """# Workflow Graph Visualization
 
 ```mermaid
 graph TD
     Start([Start]) --> Input[Input: Company + Software]
     Input --> AssessVuln[Assess Vulnerabilities]
+    Input --> AssessCrit[Assess Business Criticality]
     
     AssessVuln --> Verify[Verify Software Exists]
     Verify --> NVD{Try NVD API}
@@ -33,13 +34,13 @@ graph TD
     CVSS --> Critique[Self-Critique Loop]
     GeminiVuln --> Critique
     Critique -->|Validate CVEs| FilterConf[Filter Low Confidence]
-    FilterConf --> AssessCrit[Assess Business Criticality]
+    FilterConf --> MakeDecision[Make Decision]
     
     AssessCrit --> TavilyCompany[Search Company Info]
     TavilyCompany --> TavilySoftware[Search Software Info]
     TavilySoftware --> GeminiCrit[Gemini Chain-of-Thought<br/>Criticality Analysis]
     
-    GeminiCrit --> MakeDecision[Make Decision]
+    GeminiCrit --> MakeDecision
     MakeDecision --> Policy{Decision Policy}
     
     Policy -->|No Vulns| Approve1[✓ APPROVE]
@@ -71,7 +72,7 @@ graph TD
    - Validates matches with self-critique loop to prevent false positives
    - Filters out low-confidence matches automatically
 
-2. **assess_criticality** - Determine business importance using web search + LLM
+2. **assess_criticality** - Determine business importance using web search + LLM (runs in parallel with step 1)
    - Uses chain-of-thought reasoning for explainable assessments
    - Analyzes company business, software purpose, and operational impact
    
@@ -86,18 +87,9 @@ graph TD
 - **Tavily** - AI-optimized web search
 - **Gemini** - Google's LLM for analysis (temperature=0 for determinism)
 - **LangGraph** - Workflow orchestration
-"""
-    
-    os.makedirs("viz", exist_ok=True)
-    with open("viz/workflow_diagram.md", "w", encoding="utf-8") as f:
-        f.write(mermaid)
-    
-    print("✅ Mermaid diagram saved to viz/workflow_diagram.md")
-    print("   View it at: https://mermaid.live/ or in any Markdown viewer")
+""".encode("utf-8")
 
-def create_ascii_diagram():
-    """Create a simple ASCII diagram."""
-    ascii_art = """
+_ASCII_BYTES = """
 ┌─────────────────────────────────────────────────────────────────┐
 │                  RISK ASSESSMENT WORKFLOW                       │
 └─────────────────────────────────────────────────────────────────┘
@@ -138,11 +130,21 @@ INPUT: Company Name + Software Name
    │
    ▼
 OUTPUT: Decision + Summary + Traces + CVSS Scores (JSON)
-"""
+""".encode("utf-8")
+
+
+def create_mermaid_diagram():
+    """Create a Mermaid diagram of the workflow."""
+    os.makedirs("viz", exist_ok=True)
+    Path("viz/workflow_diagram.md").write_bytes(_MERMAID_BYTES)
     
+    print("✅ Mermaid diagram saved to viz/workflow_diagram.md")
+    print("   View it at: https://mermaid.live/ or in any Markdown viewer")
+
+def create_ascii_diagram():
+    """Create a simple ASCII diagram."""
     os.makedirs("viz", exist_ok=True)
-    with open("viz/workflow_ascii.txt", "w", encoding="utf-8") as f:
-        f.write(ascii_art)
+    Path("viz/workflow_ascii.txt").write_bytes(_ASCII_BYTES)
     
     print("✅ ASCII diagram saved to viz/workflow_ascii.txt")
 
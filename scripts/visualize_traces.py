@@ -9,30 +9,57 @@ Generates markdown reports with:
 - Results summary
 """
 
-import json
 import os
+import sys
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from risk_assessment.utils import calculate_costs_batch
+
+EXPORT_WORKERS = 4
+
+# (trace key, label) pairs shown as step details in the terminal view
+TRACE_DETAIL_FIELDS = (
+    ("query", "Query"),
+    ("results_count", "Results"),
+    ("vulnerabilities_found", "Vulns"),
+    ("criticality", "Level"),
+    ("source", "Source"),
+    ("data_source", "Data"),
+)
+
+
+def iter_assessment_results(output_dir="outputs"):
+    """Yield assessment results from output directory one file at a time."""
+    try:
+        entries = os.scandir(output_dir)
+    except FileNotFoundError:
+        return
+    
+    with entries:
+        for entry in entries:
+            # Skip non-JSON and example files
+            if not entry.name.endswith(".json") or entry.name.startswith("example_"):
+                continue
+            
+            try:
+                data = orjson.loads(Path(entry.path).read_bytes())
+            except Exception as e:
+                print(f"⚠️  Could not load {entry.path}: {e}")
+                continue
+            data["filename"] = entry.name
+            yield data
+
 
 def load_assessment_results(output_dir="outputs"):
     """Load all assessment results from output directory."""
-    results = []
-    output_path = Path(output_dir)
-    
-    for json_file in output_path.glob("*.json"):
-        # Skip example files
-        if "example_" in json_file.name:
-            continue
-        
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                data["filename"] = json_file.name
-                results.append(data)
-        except Exception as e:
-            print(f"⚠️  Could not load {json_file}: {e}")
-    
-    return results
+    return list(iter_assessment_results(output_dir))
 
 
 def visualize_trace(assessment):
@@ -52,8 +79,9 @@ def visualize_trace(assessment):
     print(f"📅 Timestamp: {timestamp}")
     print(f"📊 Total Steps: {len(traces)}")
     
-    # Calculate total time
-    total_time = sum(trace.get("elapsed_time", 0) for trace in traces)
+    # Calculate total time (elapsed times are reused for each step below)
+    elapsed_times = [trace.get("elapsed_time", 0) for trace in traces]
+    total_time = sum(elapsed_times)
     print(f"⏱️  Total Time: {total_time:.2f}s")
     
     print("\n" + "─"*80)
@@ -61,25 +89,16 @@ def visualize_trace(assessment):
     print("─"*80)
     
     # Show each trace step
-    for i, trace in enumerate(traces, 1):
+    for i, (trace, elapsed) in enumerate(zip(traces, elapsed_times), 1):
         step_name = trace.get("step", "unknown")
         tool = trace.get("tool", "unknown")
-        elapsed = trace.get("elapsed_time", 0)
         
-        # Step-specific details
+        # Step-specific details, one lookup per key
         details = []
-        if "query" in trace:
-            details.append(f"Query: {trace['query']}")
-        if "results_count" in trace:
-            details.append(f"Results: {trace['results_count']}")
-        if "vulnerabilities_found" in trace:
-            details.append(f"Vulns: {trace['vulnerabilities_found']}")
-        if "criticality" in trace:
-            details.append(f"Level: {trace['criticality']}")
-        if "source" in trace:
-            details.append(f"Source: {trace['source']}")
-        if "data_source" in trace:
-            details.append(f"Data: {trace['data_source']}")
+        for key, label in TRACE_DETAIL_FIELDS:
+            value = trace.get(key)
+            if value is not None:
+                details.append(f"{label}: {value}")
         
         # Progress bar
         bar_length = int((elapsed / total_time) * 30) if total_time > 0 else 0
@@ -136,58 +155,95 @@ def create_performance_report(assessments):
     print("="*80)
     print()
     
-    # Collect stats
-    all_traces = []
-    for assessment in assessments:
-        all_traces.extend(assessment.get("traces", []))
+    # Collect all stats in a single pass over assessments and their traces
+    tool_stats = defaultdict(lambda: [0, 0.0])  # tool -> [calls, total time]
+    decisions = Counter()
+    input_tokens, output_tokens, cached_tokens = [], [], []
+    cacheable = cache_hits = num_traces = 0
     
-    if not all_traces:
+    for assessment in assessments:
+        decisions[assessment.get("decision")] += 1
+        for trace in assessment.get("traces", []):
+            num_traces += 1
+            stats = tool_stats[trace.get("tool", "unknown")]
+            stats[0] += 1
+            stats[1] += trace.get("elapsed_time") or 0
+            
+            cost = trace.get("cost")
+            if cost:
+                input_tokens.append(cost.get("input_tokens", 0))
+                output_tokens.append(cost.get("output_tokens", 0))
+                cached_tokens.append(cost.get("cached_tokens", 0))
+            
+            if "cache_hit" in trace:
+                cacheable += 1
+                cache_hits += bool(trace["cache_hit"])
+    
+    if not num_traces:
         print("No traces found.")
         return
     
-    # Stats by tool
-    tool_times = {}
-    tool_counts = {}
-    
-    for trace in all_traces:
-        tool = trace.get("tool", "unknown")
-        elapsed = trace.get("elapsed_time", 0)
-        
-        if tool not in tool_times:
-            tool_times[tool] = []
-            tool_counts[tool] = 0
-        
-        tool_times[tool].append(elapsed)
-        tool_counts[tool] += 1
-    
     # Display stats
     print("Tool Usage Statistics:")
     print("─"*80)
     print(f"{'Tool':<20} {'Calls':<10} {'Avg Time (s)':<15} {'Total Time (s)':<15}")
     print("─"*80)
     
-    for tool in sorted(tool_times.keys()):
-        times = tool_times[tool]
-        count = tool_counts[tool]
-        avg_time = sum(times) / len(times)
-        total_time = sum(times)
+    for tool in sorted(tool_stats):
+        count, total_time = tool_stats[tool]
+        avg_time = total_time / count
         
         print(f"{tool:<20} {count:<10} {avg_time:<15.2f} {total_time:<15.2f}")
     
     print()
     
+    # LLM cost, computed in one batch over all traces that report token usage
+    if input_tokens:
+        costs = calculate_costs_batch(input_tokens, output_tokens, cached_tokens=cached_tokens)
+        print("LLM Cost:")
+        print("─"*80)
+        print(f"LLM calls with usage: {len(input_tokens)}")
+        print(f"Tokens: {costs['total_tokens']:,} ({costs['cached_tokens']:,} cached)")
+        print(f"Estimated cost: ${costs['estimated_cost_usd']:.6f}")
+        print()
+    
+    # Cache stats (steps that report whether they were served from a cache)
+    if cacheable:
+        print("Cache Efficiency:")
+        print("─"*80)
+        print(f"Cache hits: {cache_hits}/{cacheable} cacheable steps ({cache_hits/cacheable*100:.1f}%)")
+        print()
+    
     # Decision stats
-    approvals = sum(1 for a in assessments if a.get("decision") == "approve")
-    declines = sum(1 for a in assessments if a.get("decision") == "decline")
+    total = sum(decisions.values())
+    approvals = decisions["approve"]
+    declines = decisions["decline"]
     
     print("Decision Statistics:")
     print("─"*80)
-    print(f"Total Assessments: {len(assessments)}")
-    print(f"✅ Approved: {approvals} ({approvals/len(assessments)*100:.1f}%)")
-    print(f"❌ Declined: {declines} ({declines/len(assessments)*100:.1f}%)")
+    print(f"Total Assessments: {total}")
+    print(f"✅ Approved: {approvals} ({approvals/total*100:.1f}%)")
+    print(f"❌ Declined: {declines} ({declines/total*100:.1f}%)")
     print()
 
 
+def trace_markdown_path(assessment, trace_dir="viz/traces"):
+    """
+    Build the markdown path for an assessment.
+    
+    Named after the assessment's own output file (which carries its
+    timestamp), so repeated runs of the same software/company pair get
+    separate trace files.
+    """
+    source = assessment.get("filename")
+    if source:
+        return f"{trace_dir}/{Path(source).stem}_trace.md"
+    
+    software = assessment.get("software_name", "Unknown").replace(" ", "_")
+    company = assessment.get("company_name", "Unknown").replace(" ", "_")
+    return f"{trace_dir}/{software}_{company}_trace.md"
+
+
 def export_trace_to_markdown(assessment, output_file):
     """Export trace visualization to markdown file."""
     company = assessment.get("company_name", "Unknown")
@@ -196,7 +252,7 @@ def export_trace_to_markdown(assessment, output_file):
     timestamp = assessment.get("timestamp", "")
     traces = assessment.get("traces", [])
     
-    md_content = f"""# Trace Visualization: {software} @ {company}
+    parts = [f"""# Trace Visualization: {software} @ {company}
 
 **Decision**: {decision}  
 **Timestamp**: {timestamp}  
@@ -209,7 +265,7 @@ gantt
     title Execution Timeline
     dateFormat  X
     axisFormat %S.%Ls
-"""
+"""]
     
     current_time = 0
     for i, trace in enumerate(traces, 1):
@@ -217,15 +273,15 @@ gantt
         elapsed = trace.get("elapsed_time", 0)
         start = int(current_time * 1000)
         end = int((current_time + elapsed) * 1000)
-        md_content += f"    {step_name} : {start}, {end}\n"
+        parts.append(f"    {step_name} : {start}, {end}\n")
         current_time += elapsed
     
-    md_content += "```\n\n"
+    parts.append("```\n\n")
     
     # Add detailed trace table
-    md_content += "## Detailed Trace\n\n"
-    md_content += "| Step | Tool | Time (s) | Details |\n"
-    md_content += "|------|------|----------|----------|\n"
+    parts.append("## Detailed Trace\n\n")
+    parts.append("| Step | Tool | Time (s) | Details |\n")
+    parts.append("|------|------|----------|----------|\n")
     
     for i, trace in enumerate(traces, 1):
         step_name = trace.get("step", "unknown")
@@ -242,25 +298,29 @@ gantt
         
         details_str = ", ".join(details) if details else "-"
         
-        md_content += f"| {i}. {step_name} | {tool} | {elapsed:.2f}s | {details_str} |\n"
+        parts.append(f"| {i}. {step_name} | {tool} | {elapsed:.2f}s | {details_str} |\n")
     
-    md_content += "\n"
+    parts.append("\n")
     
     # Add results
-    md_content += "## Results\n\n"
-    md_content += f"- **Decision**: {decision}\n"
-    md_content += f"- **Criticality**: {assessment.get('criticality_level', 'unknown').upper()}\n"
-    md_content += f"- **Vulnerability Summary**: {assessment.get('vulnerability_summary', 'N/A')}\n"
+    parts.append("## Results\n\n")
+    parts.append(f"- **Decision**: {decision}\n")
+    parts.append(f"- **Criticality**: {assessment.get('criticality_level', 'unknown').upper()}\n")
+    parts.append(f"- **Vulnerability Summary**: {assessment.get('vulnerability_summary', 'N/A')}\n")
     
-    # Write to file
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(md_content)
+    # Join once and write in a single call
+    Path(output_file).write_text("".join(parts), encoding="utf-8")
     
     return output_file
 
 
-def main():
+def main(argv=None):
     """Main function."""
+    parser = argparse.ArgumentParser(description="Visualize execution traces from assessment runs.")
+    parser.add_argument("--quiet", "-q", action="store_true",
+                        help="Only export markdown traces; skip the terminal reports")
+    args = parser.parse_args(argv)
+    
     print("="*80)
     print("TRACE VISUALIZATION (Bonus #2)")
     print("="*80)
@@ -277,19 +337,21 @@ def main():
     
     print(f"✅ Found {len(assessments)} assessment(s)\n")
     
-    # Show summary table
-    create_summary_table(assessments)
-    
-    # Show performance analysis
-    create_performance_report(assessments)
-    
-    # Show detailed traces
-    print("="*80)
-    print("DETAILED EXECUTION TRACES")
-    print("="*80)
-    
-    for assessment in assessments:
-        visualize_trace(assessment)
+    # Terminal reports format every trace, so skip them entirely when quiet
+    if not args.quiet:
+        # Show summary table
+        create_summary_table(assessments)
+        
+        # Show performance analysis
+        create_performance_report(assessments)
+        
+        # Show detailed traces
+        print("="*80)
+        print("DETAILED EXECUTION TRACES")
+        print("="*80)
+        
+        for assessment in assessments:
+            visualize_trace(assessment)
     
     # Export to markdown
     print("="*80)
@@ -299,20 +361,23 @@ def main():
     
     os.makedirs("viz/traces", exist_ok=True)
     
-    for assessment in assessments:
-        software = assessment.get("software_name", "Unknown").replace(" ", "_")
-        company = assessment.get("company_name", "Unknown").replace(" ", "_")
-        filename = f"viz/traces/{software}_{company}_trace.md"
-        
-        export_trace_to_markdown(assessment, filename)
-        print(f"✅ Exported: {filename}")
+    # One export per target path, so concurrent writers never share a file;
+    # if two assessments still map to the same path, the later one wins
+    exports = {trace_markdown_path(assessment): assessment for assessment in assessments}
+    
+    # Exports are independent, so build and write them concurrently
+    with ThreadPoolExecutor(max_workers=EXPORT_WORKERS) as pool:
+        for filename in pool.map(export_trace_to_markdown, exports.values(), exports.keys()):
+            if not args.quiet:
+                print(f"✅ Exported: {filename}")
     
     print()
     print("="*80)
     print("TRACE VISUALIZATION COMPLETE!")
     print("="*80)
     print()
-    print("📊 Summary available in terminal")
+    if not args.quiet:
+        print("📊 Summary available in terminal")
     print("📁 Detailed traces exported to viz/traces/")
     print("🔍 View markdown files for timeline diagrams")
     print()
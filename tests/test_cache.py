@@ -0,0 +1,79 @@
+"""
+Unit tests for the on-disk response cache.
+"""
+
+import os
+import pytest
+from risk_assessment.cache import ResponseCache
+from risk_assessment.models import RiskAssessmentOutput, Decision, Criticality, Trace
+
+
+def make_output(company="Shopify", software="Tiles"):
+    return RiskAssessmentOutput(
+        company_name=company,
+        software_name=software,
+        decision=Decision.DECLINE,
+        vulnerability_summary="1 critical",
+        criticality_level=Criticality.HIGH,
+        criticality_reasoning="Core system",
+        final_summary="Summary"
+    )
+
+
+class TestResponseCache:
+    """Test ResponseCache."""
+    
+    def test_miss_then_hit(self, tmp_path):
+        """Test stored outputs are returned for the same pair."""
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        assert cache.get("Shopify", "Tiles") is None
+        
+        cache.set("Shopify", "Tiles", make_output())
+        cached = cache.get("Shopify", "Tiles")
+        
+        assert cached.model_dump(exclude={"traces"}) == make_output().model_dump(exclude={"traces"})
+    
+    def test_hit_is_marked_in_traces(self, tmp_path):
+        """Test outputs served from the cache carry a response_cache trace."""
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        cache.set("Shopify", "Tiles", make_output())
+        
+        trace = cache.get("Shopify", "Tiles").traces[-1]
+        
+        assert trace.step == "response_cache"
+        assert trace.model_extra["cache_hit"] is True
+    
+    def test_degraded_output_is_not_stored(self, tmp_path):
+        """Test outputs whose traces record an error are not cached."""
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        output = make_output()
+        output.traces.append(Trace(step="cve_search_nvd", tool="nvd_api", error="503 Service Unavailable"))
+        
+        cache.set("Shopify", "Tiles", output)
+        
+        assert cache.get("Shopify", "Tiles") is None
+    
+    def test_key_is_normalized(self, tmp_path):
+        """Test keys ignore case and surrounding whitespace."""
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        cache.set("Shopify", "Tiles", make_output())
+        
+        assert cache.get(" shopify ", "TILES") is not None
+        assert cache.get("Shopify", "Tiles Pro") is None
+    
+    def test_expired_entry_is_ignored(self, tmp_path):
+        """Test entries older than the TTL are misses."""
+        cache = ResponseCache(cache_dir=str(tmp_path), ttl_seconds=60)
+        cache.set("Shopify", "Tiles", make_output())
+        path = tmp_path / f"{ResponseCache.make_key('Shopify', 'Tiles')}.json"
+        os.utime(path, (0, 0))
+        
+        assert cache.get("Shopify", "Tiles") is None
+    
+    def test_corrupt_entry_is_ignored(self, tmp_path):
+        """Test unreadable entries are treated as misses."""
+        cache = ResponseCache(cache_dir=str(tmp_path))
+        path = tmp_path / f"{ResponseCache.make_key('Shopify', 'Tiles')}.json"
+        path.write_text("{not json")
+        
+        assert cache.get("Shopify", "Tiles") is None
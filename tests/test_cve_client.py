@@ -2,8 +2,24 @@
 Unit tests for CVE database client.
 """
 
+import asyncio
+import orjson
 import pytest
-from risk_assessment.cve_client import CVEDatabaseClient
+from datetime import datetime
+from risk_assessment.cve_client import (
+    CVEDatabaseClient,
+    NVD_RATE_LIMIT,
+    NVD_RATE_LIMIT_WITH_KEY,
+    NVD_RATE_WINDOW_SECONDS,
+    _iso
+)
+from risk_assessment.utils import NVDCache
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Shared client for tests that only exercise pure parsing helpers."""
+    return CVEDatabaseClient()
 
 
 class TestCVEDatabaseClient:
@@ -14,6 +30,7 @@ class TestCVEDatabaseClient:
         client = CVEDatabaseClient()
         assert client.nvd_base_url == "https://services.nvd.nist.gov/rest/json/cves/2.0"
         assert client.api_key is None
+        assert "gzip" in client.session.headers["Accept-Encoding"]
     
     def test_client_with_api_key(self):
         """Test client initialization with API key."""
@@ -21,74 +38,38 @@ class TestCVEDatabaseClient:
         assert client.api_key == "test_key"
         assert "apiKey" in client.session.headers
     
-    def test_v2_score_to_severity(self):
-        """Test CVSS v2 score conversion."""
-        client = CVEDatabaseClient()
-        
-        assert client._v2_score_to_severity(9.0) == "high"
-        assert client._v2_score_to_severity(7.5) == "high"
-        assert client._v2_score_to_severity(6.0) == "medium"
-        assert client._v2_score_to_severity(4.0) == "medium"
-        assert client._v2_score_to_severity(3.0) == "low"
-        assert client._v2_score_to_severity(0.5) == "low"
-        assert client._v2_score_to_severity(0.0) == "unknown"
-    
-    def test_extract_severity_v31(self):
-        """Test severity extraction from CVSS v3.1."""
-        client = CVEDatabaseClient()
-        
-        metrics = {
-            "cvssMetricV31": [{
-                "cvssData": {
-                    "baseSeverity": "HIGH"
-                }
-            }]
-        }
-        
-        severity = client._extract_severity(metrics)
-        assert severity == "high"
+    def test_rate_limit_depends_on_api_key(self):
+        """Test the default limiter follows NVD's keyed/unkeyed request limits."""
+        assert CVEDatabaseClient().rate_limiter.max_calls == NVD_RATE_LIMIT
+        assert CVEDatabaseClient(api_key="k").rate_limiter.max_calls == NVD_RATE_LIMIT_WITH_KEY
+        assert CVEDatabaseClient().rate_limiter.period == NVD_RATE_WINDOW_SECONDS
     
-    def test_extract_severity_v30_fallback(self):
-        """Test severity extraction falls back to CVSS v3.0."""
-        client = CVEDatabaseClient()
-        
-        metrics = {
-            "cvssMetricV30": [{
-                "cvssData": {
-                    "baseSeverity": "CRITICAL"
-                }
-            }]
-        }
-        
-        severity = client._extract_severity(metrics)
-        assert severity == "critical"
-    
-    def test_extract_severity_v2_fallback(self):
-        """Test severity extraction falls back to CVSS v2."""
-        client = CVEDatabaseClient()
-        
-        metrics = {
-            "cvssMetricV2": [{
-                "cvssData": {
-                    "baseScore": 8.5
-                }
-            }]
-        }
-        
-        severity = client._extract_severity(metrics)
-        assert severity == "high"
+    @pytest.mark.parametrize("score,expected", [
+        (9.0, "high"),
+        (7.5, "high"),
+        (6.0, "medium"),
+        (4.0, "medium"),
+        (3.0, "low"),
+        (0.5, "low"),
+        (0.0, "unknown"),
+    ])
+    def test_v2_score_to_severity(self, client, score, expected):
+        """Test CVSS v2 score conversion."""
+        assert client._v2_score_to_severity(score) == expected
     
-    def test_extract_severity_unknown(self):
-        """Test unknown severity when no metrics available."""
-        client = CVEDatabaseClient()
-        
-        severity = client._extract_severity({})
-        assert severity == "unknown"
+    @pytest.mark.parametrize("metrics,expected", [
+        ({"cvssMetricV31": [{"cvssData": {"baseSeverity": "HIGH"}}]}, "high"),
+        ({"cvssMetricV30": [{"cvssData": {"baseSeverity": "CRITICAL"}}]}, "critical"),
+        ({"cvssMetricV2": [{"cvssData": {"baseScore": 8.5}}]}, "high"),
+        ({}, "unknown"),
+    ], ids=["v31", "v30_fallback", "v2_fallback", "unknown"])
+    def test_extract_severity(self, client, metrics, expected):
+        """Test severity extraction prefers CVSS v3.1, then v3.0, then v2."""
+        severity, _ = client._extract_severity(metrics)
+        assert severity == expected
     
-    def test_parse_cve_data(self):
+    def test_parse_cve_data(self, client):
         """Test parsing CVE data from NVD response."""
-        client = CVEDatabaseClient()
-        
         nvd_response = {
             "vulnerabilities": [
                 {
@@ -117,3 +98,239 @@ class TestCVEDatabaseClient:
         assert cves[0]["published_date"] == "2024-01-15T10:00:00.000"
         assert "nvd.nist.gov" in cves[0]["source_url"]
 
+    
+    def test_search_cves_many_preserves_order(self, monkeypatch):
+        """Test concurrent searches return results in input order."""
+        client = CVEDatabaseClient()
+        monkeypatch.setattr(
+            client,
+            "search_cves",
+            lambda software_name, days_back, max_results: {"query": software_name}
+        )
+        
+        results = asyncio.run(client.search_cves_many(["A", "B", "C"]))
+        
+        assert [r["query"] for r in results] == ["A", "B", "C"]
+    
+    def test_search_cves_uses_cache(self, monkeypatch):
+        """Test repeated searches are served from the in-process cache."""
+        client = CVEDatabaseClient()
+        calls = []
+        
+        class FakeResponse:
+            content = b'{"totalResults": 0, "vulnerabilities": [], "products": []}'
+            
+            def raise_for_status(self):
+                pass
+        
+        def fake_get(url, params, timeout):
+            calls.append(url)
+            return FakeResponse()
+        
+        monkeypatch.setattr(client.session, "get", fake_get)
+        
+        first = client.search_cves("Tiles")
+        second = client.search_cves("tiles")
+        
+        assert calls == [client.cpe_url, client.nvd_base_url]
+        assert first["source"] == "nvd_api"
+        assert second["source"] == "nvd_cache"
+        assert second["query"] == "tiles"
+    
+    def test_search_cves_persists_to_disk_cache(self, monkeypatch, tmp_path):
+        """Test a new client reuses results on disk, keyed by the search parameters."""
+        calls = []
+        
+        class FakeResponse:
+            content = b'{"totalResults": 0, "vulnerabilities": [], "products": []}'
+            
+            def raise_for_status(self):
+                pass
+        
+        def fake_get(url, params, timeout):
+            calls.append(url)
+            return FakeResponse()
+        
+        first_client = CVEDatabaseClient(disk_cache=NVDCache(cache_dir=str(tmp_path)))
+        monkeypatch.setattr(first_client.session, "get", fake_get)
+        first_client.search_cves("Tiles")
+        
+        second_client = CVEDatabaseClient(disk_cache=NVDCache(cache_dir=str(tmp_path)))
+        monkeypatch.setattr(second_client.session, "get", fake_get)
+        calls.clear()
+        
+        cached = second_client.search_cves("Tiles")
+        assert calls == []
+        assert cached["source"] == "nvd_cache"
+        assert cached["cache_tier"] == "disk"
+        assert second_client.search_cves("Tiles")["cache_tier"] == "memory"
+        
+        # Different parameters are a different entry
+        second_client.search_cves("Tiles", days_back=30)
+        assert calls[-1] == second_client.nvd_base_url
+    
+    def test_iso_date_format(self):
+        """Test NVD date formatting matches the required ISO 8601 layout."""
+        date = datetime(2024, 3, 5, 7, 8, 9, 123456)
+        assert _iso(date) == "2024-03-05T07:08:09.000"
+        assert _iso(date) == date.strftime("%Y-%m-%dT%H:%M:%S.000")
+    
+    def test_search_cves_uses_matching_cpe(self, monkeypatch):
+        """Test CVE search uses virtualMatchString when the CPE product matches."""
+        client = CVEDatabaseClient()
+        requests_made = []
+        
+        class FakeResponse:
+            def __init__(self, content):
+                self.content = content
+            
+            def raise_for_status(self):
+                pass
+        
+        def fake_get(url, params, timeout):
+            requests_made.append((url, params))
+            if url == client.cpe_url:
+                return FakeResponse(
+                    b'{"products": ['
+                    b'{"cpe": {"cpeName": "cpe:2.3:a:apache:tiles:3.0:*:*:*:*:*:*:*"}},'
+                    b'{"cpe": {"cpeName": "cpe:2.3:a:langflow:langflow:1.0.0:*:*:*:*:*:*:*"}}'
+                    b']}'
+                )
+            if "virtualMatchString" in params:
+                return FakeResponse(
+                    b'{"totalResults": 7, "vulnerabilities": [{"cve": {"id": "CVE-1"}}]}'
+                )
+            return FakeResponse(b'{"totalResults": 0, "vulnerabilities": []}')
+        
+        monkeypatch.setattr(client.session, "get", fake_get)
+        
+        result = client.search_cves("Langflow")
+        
+        assert result["cpe"] == "cpe:2.3:a:langflow:langflow"
+        assert result["total_results"] == 7
+        # One CPE lookup plus one CVE query; no keyword search
+        assert len(requests_made) == 2
+        cve_params = requests_made[-1][1]
+        assert cve_params["virtualMatchString"] == "cpe:2.3:a:langflow:langflow"
+        assert "keywordSearch" not in cve_params
+    
+    def test_search_cves_falls_back_to_keyword_when_cpe_empty(self, monkeypatch):
+        """Test an empty CPE match falls back to keyword search and reports its total."""
+        client = CVEDatabaseClient()
+        requests_made = []
+        
+        class FakeResponse:
+            def __init__(self, content):
+                self.content = content
+            
+            def raise_for_status(self):
+                pass
+        
+        def fake_get(url, params, timeout):
+            requests_made.append(params)
+            if url == client.cpe_url:
+                return FakeResponse(
+                    b'{"products": [{"cpe": {"cpeName": "cpe:2.3:a:langflow:langflow:1.0:*:*:*:*:*:*:*"}}]}'
+                )
+            if "virtualMatchString" in params:
+                return FakeResponse(b'{"totalResults": 0, "vulnerabilities": []}')
+            return FakeResponse(b'{"totalResults": 4, "vulnerabilities": [{"cve": {"id": "CVE-9"}}]}')
+        
+        monkeypatch.setattr(client.session, "get", fake_get)
+        
+        result = client.search_cves("Langflow")
+        
+        assert requests_made[-1]["keywordSearch"] == "Langflow"
+        assert [c["cve_id"] for c in result["cves"]] == ["CVE-9"]
+        assert result["total_results"] == 4
+    
+    def test_resolve_cpe_rejects_ambiguous_vendor(self, monkeypatch):
+        """Test a product name shipped by several vendors falls back to keyword search."""
+        client = CVEDatabaseClient()
+        
+        class FakeResponse:
+            content = (
+                b'{"products": ['
+                b'{"cpe": {"cpeName": "cpe:2.3:a:acme:tiles:1.0:*:*:*:*:*:*:*"}},'
+                b'{"cpe": {"cpeName": "cpe:2.3:a:apache:tiles:3.0:*:*:*:*:*:*:*"}}'
+                b']}'
+            )
+            
+            def raise_for_status(self):
+                pass
+        
+        monkeypatch.setattr(client.session, "get", lambda url, params, timeout: FakeResponse())
+        
+        assert client._resolve_cpe("Tiles") is None
+    
+    def test_search_cves_keeps_unanalyzed_keyword_hits(self, monkeypatch):
+        """Test opting in merges recent CVEs without CPE configurations into CPE results."""
+        client = CVEDatabaseClient()
+        
+        def cve(cve_id, configurations=None):
+            item = {"cve": {"id": cve_id, "descriptions": [], "metrics": {}}}
+            if configurations:
+                item["cve"]["configurations"] = configurations
+            return item
+        
+        class FakeResponse:
+            def __init__(self, data):
+                self.content = orjson.dumps(data)
+            
+            def raise_for_status(self):
+                pass
+        
+        def fake_get(url, params, timeout):
+            if url == client.cpe_url:
+                return FakeResponse({"products": [
+                    {"cpe": {"cpeName": "cpe:2.3:a:langflow:langflow:1.0.0:*:*:*:*:*:*:*"}}
+                ]})
+            if "virtualMatchString" in params:
+                return FakeResponse({"totalResults": 1, "vulnerabilities": [cve("CVE-1", [{}])]})
+            return FakeResponse({"totalResults": 3, "vulnerabilities": [
+                cve("CVE-1", [{}]),
+                cve("CVE-2", [{"nodes": ["other product"]}]),
+                cve("CVE-3")
+            ]})
+        
+        monkeypatch.setattr(client.session, "get", fake_get)
+        
+        result = client.search_cves("Langflow", include_unanalyzed=True)
+        
+        assert [c["cve_id"] for c in result["cves"]] == ["CVE-1", "CVE-3"]
+        assert result["total_results"] == 2
+    
+    def test_resolve_cpe_persists_to_disk_cache(self, monkeypatch, tmp_path):
+        """Test CPE resolutions are reused by later clients without an NVD request."""
+        calls = []
+        
+        class FakeResponse:
+            content = b'{"products": [{"cpe": {"cpeName": "cpe:2.3:a:langflow:langflow:1.0:*:*:*:*:*:*:*"}}]}'
+            
+            def raise_for_status(self):
+                pass
+        
+        def fake_get(url, params, timeout):
+            calls.append(url)
+            return FakeResponse()
+        
+        for _ in range(2):
+            client = CVEDatabaseClient(disk_cache=NVDCache(cache_dir=str(tmp_path)))
+            monkeypatch.setattr(client.session, "get", fake_get)
+            assert client._resolve_cpe("Langflow") == "cpe:2.3:a:langflow:langflow"
+        
+        assert len(calls) == 1
+    
+    def test_resolve_cpe_rejects_different_product(self, monkeypatch):
+        """Test similarly named products are not used as the CPE."""
+        client = CVEDatabaseClient()
+        
+        class FakeResponse:
+            content = b'{"products": [{"cpe": {"cpeName": "cpe:2.3:a:apache:tiles:3.0:*:*:*:*:*:*:*"}}]}'
+            
+            def raise_for_status(self):
+                pass
+        
+        monkeypatch.setattr(client.session, "get", lambda url, params, timeout: FakeResponse())
+        
+        assert client._resolve_cpe("Tiles Pro") is None
@@ -9,182 +9,190 @@ from risk_assessment.models import (
     CriticalityAssessment,
     Severity,
     Criticality,
-    Decision
+    Decision,
+    SEVERITY_HIGH,
+    SEVERITY_LOW
 )
-from risk_assessment.decision_policy import make_decision, generate_final_summary
+from risk_assessment.decision_policy import make_decision, generate_final_summary, _severity_profile
+
+# Content expected in the summary built by test_summary_includes_all_components
+EXPECTED_TOKENS = (
+    "Test Co", "Test App", "APPROVE", "Test summary",
+    "MEDIUM", "Useful tool", "Test reasoning"
+)
+# Markdown structure every summary must have
+MD_TOKENS = (
+    "# Risk Assessment Report", "**Company:**", "**Software:**", "**Decision:**",
+    "## Security Assessment", "## Business Criticality Assessment", "## Final Decision"
+)
+_ZERO_COUNTS = {"critical": 0, "high": 0, "medium": 0, "low": 0, "unknown": 0}
+
+
+def _counts(**overrides) -> dict:
+    """Severity counts with every level zero except the given overrides."""
+    counts = _ZERO_COUNTS.copy()
+    counts.update(overrides)
+    return counts
+
+
+def _vuln_assessment(*severities: Severity) -> VulnerabilityAssessment:
+    """Build a vulnerability assessment with one vulnerability per severity."""
+    counts = _counts()
+    for severity in severities:
+        counts[severity.value] += 1
+    return VulnerabilityAssessment(
+        software_name="App",
+        total_count=len(severities),
+        vulnerabilities=[
+            Vulnerability(severity=severity, description=f"{severity.value} issue")
+            for severity in severities
+        ],
+        severity_counts=counts,
+        has_critical=counts["critical"] > 0,
+        has_high=counts["high"] > 0
+    )
+
+
+def _crit_assessment(criticality: Criticality) -> CriticalityAssessment:
+    """Build a criticality assessment at the given level."""
+    return CriticalityAssessment(
+        company_name="Test Co",
+        software_name="App",
+        criticality=criticality,
+        reasoning=f"{criticality.value} importance"
+    )
+
+
+# Policy tests only read the assessments, so each is built once per module
+
+@pytest.fixture(scope="module")
+def no_vulns():
+    return _vuln_assessment()
+
+
+@pytest.fixture(scope="module")
+def low_vulns():
+    return _vuln_assessment(Severity.LOW, Severity.LOW)
+
+
+@pytest.fixture(scope="module")
+def critical_vuln():
+    return _vuln_assessment(Severity.CRITICAL)
+
+
+@pytest.fixture(scope="module")
+def high_vulns():
+    return _vuln_assessment(Severity.HIGH, Severity.MEDIUM)
+
+
+@pytest.fixture(scope="module")
+def medium_vuln():
+    return _vuln_assessment(Severity.MEDIUM)
+
+
+@pytest.fixture(scope="module")
+def high_crit():
+    return _crit_assessment(Criticality.HIGH)
+
+
+@pytest.fixture(scope="module")
+def medium_crit():
+    return _crit_assessment(Criticality.MEDIUM)
+
+
+@pytest.fixture(scope="module")
+def low_crit():
+    return _crit_assessment(Criticality.LOW)
 
 
 class TestDecisionPolicy:
     """Test suite for decision policy rules."""
     
-    def test_no_vulnerabilities_approves(self):
+    def test_no_vulnerabilities_approves(self, no_vulns, high_crit):
         """Rule 1: No vulnerabilities → APPROVE"""
-        vuln = VulnerabilityAssessment(
-            software_name="Safe App",
-            total_count=0,
-            vulnerabilities=[],
-            severity_counts={"critical": 0, "high": 0, "medium": 0, "low": 0, "unknown": 0},
-            has_critical=False,
-            has_high=False
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="Safe App",
-            criticality=Criticality.HIGH,
-            reasoning="Important tool"
-        )
-        
-        decision, reasoning = make_decision(vuln, crit)
+        decision, reasoning = make_decision(no_vulns, high_crit)
         
         assert decision == Decision.APPROVE
         assert "No vulnerabilities" in reasoning
         assert "APPROVED" in reasoning
     
-    def test_high_criticality_low_vulns_approves(self):
+    def test_high_criticality_low_vulns_approves(self, low_vulns, high_crit):
         """Rule 2: High criticality + only low-risk vulnerabilities → APPROVE"""
-        vuln = VulnerabilityAssessment(
-            software_name="Tool",
-            total_count=2,
-            vulnerabilities=[
-                Vulnerability(severity=Severity.LOW, description="Minor issue"),
-                Vulnerability(severity=Severity.LOW, description="Another minor")
-            ],
-            severity_counts={"critical": 0, "high": 0, "medium": 0, "low": 2, "unknown": 0},
-            has_critical=False,
-            has_high=False
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="Tool",
-            criticality=Criticality.HIGH,
-            reasoning="Critical business tool"
-        )
-        
-        decision, reasoning = make_decision(vuln, crit)
+        decision, reasoning = make_decision(low_vulns, high_crit)
         
         assert decision == Decision.APPROVE
         assert "low-risk" in reasoning.lower()
         assert "APPROVED" in reasoning
     
-    def test_medium_criticality_low_vulns_approves(self):
+    def test_medium_criticality_low_vulns_approves(self, low_vulns, medium_crit):
         """Rule 2: Medium criticality + only low-risk vulnerabilities → APPROVE"""
-        vuln = VulnerabilityAssessment(
-            software_name="Tool",
-            total_count=1,
-            vulnerabilities=[
-                Vulnerability(severity=Severity.LOW, description="Minor issue")
-            ],
-            severity_counts={"critical": 0, "high": 0, "medium": 0, "low": 1, "unknown": 0},
-            has_critical=False,
-            has_high=False
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="Tool",
-            criticality=Criticality.MEDIUM,
-            reasoning="Useful tool"
-        )
-        
-        decision, reasoning = make_decision(vuln, crit)
+        decision, reasoning = make_decision(low_vulns, medium_crit)
         
         assert decision == Decision.APPROVE
     
-    def test_critical_vulnerability_declines(self):
+    def test_critical_vulnerability_declines(self, critical_vuln, high_crit):
         """Rule 3: Critical vulnerability → DECLINE"""
-        vuln = VulnerabilityAssessment(
-            software_name="Risky App",
-            total_count=1,
-            vulnerabilities=[
-                Vulnerability(severity=Severity.CRITICAL, description="RCE vulnerability")
-            ],
-            severity_counts={"critical": 1, "high": 0, "medium": 0, "low": 0, "unknown": 0},
-            has_critical=True,
-            has_high=False
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="Risky App",
-            criticality=Criticality.HIGH,
-            reasoning="Important"
-        )
-        
-        decision, reasoning = make_decision(vuln, crit)
+        decision, reasoning = make_decision(critical_vuln, high_crit)
         
         assert decision == Decision.DECLINE
         assert "DECLINED" in reasoning
         assert "critical" in reasoning.lower()
     
-    def test_high_vulnerability_declines(self):
+    def test_high_vulnerability_declines(self, high_vulns, low_crit):
         """Rule 3: High severity vulnerability → DECLINE"""
-        vuln = VulnerabilityAssessment(
-            software_name="Risky App",
-            total_count=2,
-            vulnerabilities=[
-                Vulnerability(severity=Severity.HIGH, description="SQL injection"),
-                Vulnerability(severity=Severity.MEDIUM, description="XSS")
-            ],
-            severity_counts={"critical": 0, "high": 2, "medium": 0, "low": 0, "unknown": 0},
-            has_critical=False,
-            has_high=True
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="Risky App",
-            criticality=Criticality.LOW,
-            reasoning="Not important"
-        )
-        
-        decision, reasoning = make_decision(vuln, crit)
+        decision, reasoning = make_decision(high_vulns, low_crit)
         
         assert decision == Decision.DECLINE
         assert "DECLINED" in reasoning
     
-    def test_medium_vulnerability_declines(self):
+    def test_medium_vulnerability_declines(self, medium_vuln, high_crit):
         """Rule 3: Medium severity vulnerability → DECLINE"""
-        vuln = VulnerabilityAssessment(
-            software_name="App",
-            total_count=1,
-            vulnerabilities=[
-                Vulnerability(severity=Severity.MEDIUM, description="Issue")
-            ],
-            severity_counts={"critical": 0, "high": 0, "medium": 1, "low": 0, "unknown": 0},
-            has_critical=False,
-            has_high=False
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="App",
-            criticality=Criticality.HIGH,
-            reasoning="Important"
-        )
-        
-        decision, reasoning = make_decision(vuln, crit)
+        decision, reasoning = make_decision(medium_vuln, high_crit)
         
         assert decision == Decision.DECLINE
         assert "DECLINED" in reasoning
     
-    def test_low_criticality_low_vulns_declines(self):
+    def test_low_criticality_low_vulns_declines(self, low_vulns, low_crit):
         """Rule 3: Low criticality + low vulnerabilities → DECLINE (not med-high)"""
-        vuln = VulnerabilityAssessment(
-            software_name="Tool",
-            total_count=1,
-            vulnerabilities=[
-                Vulnerability(severity=Severity.LOW, description="Minor")
-            ],
-            severity_counts={"critical": 0, "high": 0, "medium": 0, "low": 1, "unknown": 0},
-            has_critical=False,
-            has_high=False
-        )
-        crit = CriticalityAssessment(
-            company_name="Test Co",
-            software_name="Tool",
-            criticality=Criticality.LOW,  # Not medium-high!
-            reasoning="Not important"
-        )
+        # Not medium-high criticality
+        decision, reasoning = make_decision(low_vulns, low_crit)
         
-        decision, reasoning = make_decision(vuln, crit)
+        assert decision == Decision.DECLINE
+    
+    def test_updated_copy_with_critical_declines(self, low_vulns, high_crit):
+        """Regression: a copy updated to include a critical CVE must be declined."""
+        vuln = low_vulns.model_copy(update={
+            "total_count": 3,
+            "severity_counts": _counts(critical=1, low=2),
+            "has_critical": True
+        })
+        
+        decision, reasoning = make_decision(vuln, high_crit)
         
         assert decision == Decision.DECLINE
+        assert "1 critical" in reasoning
+        # The shared fixture itself is untouched
+        assert make_decision(low_vulns, high_crit)[0] == Decision.APPROVE
+    
+    def test_in_place_update_is_respected(self, high_crit):
+        """Regression: mutating severity fields after construction changes the decision."""
+        vuln = _vuln_assessment(Severity.LOW)
+        vuln.has_high = True
+        vuln.severity_counts = _counts(high=1, low=1)
+        
+        decision, _ = make_decision(vuln, high_crit)
+        
+        assert decision == Decision.DECLINE
+    
+    def test_severity_profile(self):
+        """Test severity bitmask and counts are derived from the current fields."""
+        vuln = VulnerabilityAssessment(
+            software_name="Software",
+            total_count=3,
+            severity_counts=_counts(high=1, low=2),
+            has_high=True
+        )
+        assert _severity_profile(vuln) == (SEVERITY_HIGH | SEVERITY_LOW, (0, 1, 0, 2, 0))
 
 
 class TestFinalSummary:
@@ -199,7 +207,7 @@ class TestFinalSummary:
                 Vulnerability(severity=Severity.LOW, description="Issue 1"),
                 Vulnerability(severity=Severity.LOW, description="Issue 2")
             ],
-            severity_counts={"critical": 0, "high": 0, "medium": 0, "low": 2, "unknown": 0},
+            severity_counts=_counts(low=2),
             has_critical=False,
             has_high=False,
             summary="Test summary"
@@ -216,13 +224,8 @@ class TestFinalSummary:
         summary = generate_final_summary(decision, reasoning, vuln, crit)
         
         # Check all components are present
-        assert "Test Co" in summary
-        assert "Test App" in summary
-        assert "APPROVE" in summary
-        assert "Test summary" in summary
-        assert "MEDIUM" in summary
-        assert "Useful tool" in summary
-        assert "Test reasoning" in summary
+        missing = [token for token in EXPECTED_TOKENS if token not in summary]
+        assert not missing, missing
     
     def test_summary_format_is_markdown(self):
         """Test that summary is valid markdown."""
@@ -241,11 +244,6 @@ class TestFinalSummary:
         summary = generate_final_summary(Decision.APPROVE, "OK", vuln, crit)
         
         # Check markdown elements
-        assert "# Risk Assessment Report" in summary
-        assert "**Company:**" in summary
-        assert "**Software:**" in summary
-        assert "**Decision:**" in summary
-        assert "## Security Assessment" in summary
-        assert "## Business Criticality Assessment" in summary
-        assert "## Final Decision" in summary
+        missing = [token for token in MD_TOKENS if token not in summary]
+        assert not missing, missing
 
@@ -0,0 +1,87 @@
+"""
+Unit tests for the CLI.
+"""
+
+import orjson
+import pytest
+
+pytest.importorskip("typer")
+pytest.importorskip("dotenv")
+
+from typer.testing import CliRunner
+from risk_assessment import main
+from risk_assessment.models import RiskAssessmentOutput, Decision, Criticality
+
+
+class FakeWorkflow:
+    async def arun(self, company_name, software_name):
+        return RiskAssessmentOutput(
+            company_name=company_name,
+            software_name=software_name,
+            decision=Decision.APPROVE,
+            vulnerability_summary="None found",
+            criticality_level=Criticality.MEDIUM,
+            criticality_reasoning="Useful",
+            final_summary="Summary"
+        )
+
+
+def make_runner() -> CliRunner:
+    # Older click mixes stderr into stdout unless told not to
+    try:
+        return CliRunner(mix_stderr=False)
+    except TypeError:
+        return CliRunner()
+
+
+class TestBatchCommand:
+    """Test the batch command."""
+    
+    def test_json_stdout_is_parseable(self, tmp_path, monkeypatch):
+        """Test --json keeps progress and save messages off stdout."""
+        monkeypatch.setenv("TAVILY_API_KEY", "test")
+        monkeypatch.setenv("GOOGLE_API_KEY", "test")
+        monkeypatch.setattr(main, "_get_workflow", lambda *args: FakeWorkflow())
+        
+        input_file = tmp_path / "requests.json"
+        input_file.write_bytes(orjson.dumps([
+            {"company": "Shopify", "software": "Tiles"},
+            {"company": "Citi", "software": "Okta"}
+        ]))
+        
+        result = make_runner().invoke(main.app, [
+            "batch", str(input_file),
+            "--output", str(tmp_path / "out"),
+            "--no-cache",
+            "--json"
+        ])
+        
+        assert result.exit_code == 0, result.output
+        results = orjson.loads(result.stdout)
+        assert [(r["company"], r["decision"]) for r in results] == [
+            ("Shopify", "approve"),
+            ("Citi", "approve")
+        ]
+        assert "Completed" in result.stderr
+        assert "Output saved to" in result.stderr
+
+
+class TestSaveOutput:
+    """Test saving assessment outputs."""
+    
+    def test_repeated_saves_do_not_overwrite(self, tmp_path):
+        """Test saving the same pair twice in quick succession keeps both files."""
+        output = RiskAssessmentOutput(
+            company_name="Shopify",
+            software_name="Tiles",
+            decision=Decision.APPROVE,
+            vulnerability_summary="None found",
+            criticality_level=Criticality.MEDIUM,
+            criticality_reasoning="Useful",
+            final_summary="Summary"
+        )
+        
+        paths = {main.save_output(output, str(tmp_path)) for _ in range(3)}
+        
+        assert len(paths) == 3
+        assert len(list(tmp_path.iterdir())) == 3
@@ -2,7 +2,9 @@
 Unit tests for data models.
 """
 
+import json
 import pytest
+from datetime import datetime
 from pydantic import ValidationError
 from risk_assessment.models import (
     Severity,
@@ -10,31 +12,43 @@ from risk_assessment.models import (
     Decision,
     Vulnerability,
     VulnerabilityAssessment,
-    CriticalityAssessment
+    CriticalityAssessment,
+    RiskAssessmentOutput,
+    Trace
 )
 
 
+_ZERO_COUNTS = {"critical": 0, "high": 0, "medium": 0, "low": 0, "unknown": 0}
+
+
+def _counts(**overrides) -> dict:
+    """Severity counts with every level zero except the given overrides."""
+    counts = _ZERO_COUNTS.copy()
+    counts.update(overrides)
+    return counts
+
+
+ENUM_CASES = [
+    (Severity, "CRITICAL", "critical"),
+    (Severity, "HIGH", "high"),
+    (Severity, "MEDIUM", "medium"),
+    (Severity, "LOW", "low"),
+    (Severity, "UNKNOWN", "unknown"),
+    (Criticality, "LOW", "low"),
+    (Criticality, "MEDIUM", "medium"),
+    (Criticality, "HIGH", "high"),
+    (Decision, "APPROVE", "approve"),
+    (Decision, "DECLINE", "decline"),
+]
+
+
 class TestEnums:
     """Test enum definitions."""
     
-    def test_severity_values(self):
-        """Test Severity enum has correct values."""
-        assert Severity.CRITICAL.value == "critical"
-        assert Severity.HIGH.value == "high"
-        assert Severity.MEDIUM.value == "medium"
-        assert Severity.LOW.value == "low"
-        assert Severity.UNKNOWN.value == "unknown"
-    
-    def test_criticality_values(self):
-        """Test Criticality enum has correct values."""
-        assert Criticality.LOW.value == "low"
-        assert Criticality.MEDIUM.value == "medium"
-        assert Criticality.HIGH.value == "high"
-    
-    def test_decision_values(self):
-        """Test Decision enum has correct values."""
-        assert Decision.APPROVE.value == "approve"
-        assert Decision.DECLINE.value == "decline"
+    @pytest.mark.parametrize("cls,name,val", ENUM_CASES)
+    def test_enum_value(self, cls, name, val):
+        """Test each enum member has the correct value."""
+        assert getattr(cls, name).value == val
 
 
 class TestVulnerability:
@@ -87,7 +101,7 @@ class TestVulnerabilityAssessment:
                 Vulnerability(severity=Severity.LOW, description="Issue 2")
             ],
             total_count=2,
-            severity_counts={"critical": 0, "high": 1, "medium": 0, "low": 1, "unknown": 0},
+            severity_counts=_counts(high=1, low=1),
             has_critical=False,
             has_high=True,
             summary="Found 2 vulnerabilities"
@@ -139,3 +153,79 @@ class TestCriticalityAssessment:
             )
             assert assessment.criticality == level
 
+
+
+class TestRiskAssessmentOutput:
+    """Test RiskAssessmentOutput export."""
+    
+    def test_to_export_json_layout(self):
+        """Test exported JSON keeps the saved-file layout."""
+        output = RiskAssessmentOutput(
+            company_name="Co",
+            software_name="Sw",
+            decision=Decision.APPROVE,
+            vulnerability_summary="None found",
+            criticality_level=Criticality.LOW,
+            criticality_reasoning="Test",
+            final_summary="Summary",
+            vulnerabilities=[
+                Vulnerability(
+                    cve_id="CVE-2024-1",
+                    severity=Severity.LOW,
+                    description="Tést",
+                    published_date="2024-01-01"
+                )
+            ],
+            software_exists=True,
+            existence_confidence="high",
+            relevance="Some"
+        )
+        
+        text = output.to_export(datetime(2024, 1, 2, 3, 4, 5)).to_json()
+        data = json.loads(text)
+        
+        assert list(data) == [
+            "timestamp", "company_name", "software_name", "decision",
+            "vulnerability_summary", "criticality_level", "criticality_reasoning",
+            "chain_of_thought", "final_summary", "vulnerabilities", "source_urls",
+            "software_verification", "traces"
+        ]
+        assert data["timestamp"] == "2024-01-02T03:04:05"
+        assert data["decision"] == "approve"
+        assert data["chain_of_thought"]["relevance"] == "Some"
+        assert data["software_verification"] == {"exists": True, "confidence": "high"}
+        assert data["vulnerabilities"][0] == {
+            "cve_id": "CVE-2024-1",
+            "severity": "low",
+            "cvss_score": None,
+            "description": "Tést",
+            "source_url": None
+        }
+        assert "Tést" in text
+        assert output.to_export(datetime(2024, 1, 2, 3, 4, 5)).to_json_bytes() == text.encode("utf-8")
+    
+    def test_typed_traces_and_sources(self):
+        """Test traces keep step-specific fields and sources are typed."""
+        output = RiskAssessmentOutput(
+            company_name="Co",
+            software_name="Sw",
+            decision=Decision.DECLINE,
+            vulnerability_summary="",
+            criticality_level=Criticality.HIGH,
+            criticality_reasoning="",
+            final_summary="",
+            traces=[{"step": "company_search", "tool": "tavily", "elapsed_time": 1.5, "results_count": 3}],
+            source_urls=[{"title": "Advisory", "url": "https://example.com", "content_preview": "..."}]
+        )
+        
+        assert isinstance(output.traces[0], Trace)
+        assert output.source_urls[0].url == "https://example.com"
+        
+        data = json.loads(output.to_export().to_json())
+        assert data["traces"][0] == {
+            "step": "company_search",
+            "tool": "tavily",
+            "elapsed_time": 1.5,
+            "results_count": 3
+        }
+        assert data["source_urls"][0]["title"] == "Advisory"
@@ -0,0 +1,57 @@
+"""
+Unit tests for the semantic cache.
+"""
+
+import pytest
+from risk_assessment.semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """Test embedding-based cache lookups."""
+    
+    def test_normalize_unit_length(self):
+        """Test vectors are scaled to unit length."""
+        vector = SemanticCache.normalize([3.0, 4.0])
+        assert vector == pytest.approx([0.6, 0.8])
+    
+    def test_normalize_zero_vector(self):
+        """Test zero vector is returned unchanged."""
+        assert SemanticCache.normalize([0.0, 0.0]) == [0.0, 0.0]
+    
+    def test_lookup_empty_cache_misses(self):
+        """Test lookup on an empty cache is a miss."""
+        cache = SemanticCache()
+        value, score = cache.lookup([1.0, 0.0])
+        assert value is None
+        assert score == 0.0
+        assert cache.misses == 1
+    
+    def test_similar_vector_hits(self):
+        """Test a near-duplicate vector returns the cached value."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add(SemanticCache.normalize([1.0, 0.0]), {"criticality": "high"})
+        
+        value, score = cache.lookup(SemanticCache.normalize([1.0, 0.1]))
+        
+        assert value == {"criticality": "high"}
+        assert score >= 0.9
+        assert cache.hits == 1
+    
+    def test_dissimilar_vector_misses(self):
+        """Test a vector below the threshold is a miss."""
+        cache = SemanticCache(threshold=0.9)
+        cache.add(SemanticCache.normalize([1.0, 0.0]), {"criticality": "high"})
+        
+        value, _ = cache.lookup(SemanticCache.normalize([0.0, 1.0]))
+        
+        assert value is None
+    
+    def test_evicts_oldest_entry(self):
+        """Test oldest entry is evicted when the cache is full."""
+        cache = SemanticCache(max_entries=2)
+        cache.add([1.0, 0.0], "first")
+        cache.add([0.0, 1.0], "second")
+        cache.add([-1.0, 0.0], "third")
+        
+        assert len(cache) == 2
+        assert cache.lookup([1.0, 0.0])[0] is None
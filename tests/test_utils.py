@@ -0,0 +1,180 @@
+"""
+Unit tests for utility helpers.
+"""
+
+import time
+import pytest
+from risk_assessment.utils import NVDCache, RateLimiter, SearchCache, TTLCache, calculate_cost, calculate_costs_batch
+
+
+class TestTTLCache:
+    """Test in-memory TTL cache."""
+    
+    def test_get_missing_key(self):
+        """Test missing keys return None and count as misses."""
+        cache = TTLCache(ttl_seconds=60)
+        assert cache.get("missing") is None
+        assert cache.misses == 1
+    
+    def test_set_and_get(self):
+        """Test stored values are returned and count as hits."""
+        cache = TTLCache(ttl_seconds=60)
+        cache.set("key", {"value": 1})
+        assert cache.get("key") == {"value": 1}
+        assert cache.hits == 1
+    
+    def test_expired_entry(self):
+        """Test entries expire after their TTL."""
+        cache = TTLCache(ttl_seconds=-1)
+        cache.set("key", "value")
+        assert cache.get("key") is None
+        assert len(cache) == 0
+    
+    def test_evicts_least_recently_used(self):
+        """Test least recently used entry is evicted when full."""
+        cache = TTLCache(ttl_seconds=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+
+class TestRateLimiter:
+    """Test rolling-window rate limiter."""
+    
+    def test_calls_within_limit_do_not_wait(self):
+        """Test calls up to the limit are allowed immediately."""
+        limiter = RateLimiter(max_calls=3, period=60)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        assert time.monotonic() - start < 0.5
+    
+    def test_blocks_until_window_frees(self):
+        """Test the call over the limit waits for the oldest call to leave the window."""
+        limiter = RateLimiter(max_calls=2, period=0.2)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        assert time.monotonic() - start >= 0.2
+
+
+class TestSearchCache:
+    """Test shared Tavily search cache."""
+    
+    class FakeClient:
+        def __init__(self):
+            self.calls = []
+        
+        def search(self, query, max_results, search_depth):
+            self.calls.append((query, max_results, search_depth))
+            return {"results": [{"title": query}]}
+    
+    def test_normalized_queries_share_entry(self):
+        """Test queries differing only in case and whitespace hit the network once."""
+        client = self.FakeClient()
+        cache = SearchCache(client)
+        
+        first, first_hit = cache.search("Slack  software", max_results=3)
+        second, second_hit = cache.search(" slack software ", max_results=3)
+        
+        assert (first_hit, second_hit) == (False, True)
+        assert second is first
+        assert len(client.calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+    
+    def test_search_parameters_are_part_of_key(self):
+        """Test different result counts or depths are cached separately."""
+        client = self.FakeClient()
+        cache = SearchCache(client)
+        
+        cache.search("slack", max_results=3)
+        cache.search("slack", max_results=5)
+        cache.search("slack", max_results=5, search_depth="advanced")
+        
+        assert len(client.calls) == 3
+
+
+class TestCalculateCost:
+    """Test API cost estimation."""
+    
+    def test_known_model(self):
+        """Test cost is computed from per-million-token rates."""
+        cost = calculate_cost(1_000_000, 1_000_000, "gemini-2.0-flash-exp")
+        assert cost["total_tokens"] == 2_000_000
+        assert cost["estimated_cost_usd"] == pytest.approx(0.375)
+        assert "cost_breakdown" not in cost
+    
+    def test_cached_tokens_discounted(self):
+        """Test cached input tokens are billed at a quarter of the input rate."""
+        cost = calculate_cost(1_000_000, 0, "gemini-2.0-flash-exp", cached_tokens=400_000, detailed=True)
+        assert cost["cached_tokens"] == 400_000
+        assert cost["cost_breakdown"]["input"] == pytest.approx(0.045)
+        assert cost["cost_breakdown"]["cached_input"] == pytest.approx(0.0075)
+        assert cost["estimated_cost_usd"] == pytest.approx(0.0525)
+    
+    def test_batch_matches_single(self):
+        """Test batch costs agree with per-request calculate_cost."""
+        inputs, outputs, cached = [1000, 250_000], [200, 3000], [0, 100_000]
+        batch = calculate_costs_batch(inputs, outputs, cached_tokens=cached)
+        
+        singles = [
+            calculate_cost(i, o, cached_tokens=c)["estimated_cost_usd"]
+            for i, o, c in zip(inputs, outputs, cached)
+        ]
+        assert batch["per_request_usd"] == pytest.approx(singles)
+        assert batch["estimated_cost_usd"] == pytest.approx(sum(singles))
+        assert batch["total_tokens"] == sum(inputs) + sum(outputs)
+    
+    def test_unknown_model(self):
+        """Test unknown models report zero cost with a note."""
+        cost = calculate_cost(10, 20, "unknown-model")
+        assert cost["estimated_cost_usd"] == 0.0
+        assert "note" in cost
+    
+    def test_batch_unknown_model(self):
+        """Test batch costs for unknown models carry the same note."""
+        batch = calculate_costs_batch([10], [20], "unknown-model")
+        assert batch["estimated_cost_usd"] == 0.0
+        assert batch["note"] == calculate_cost(10, 20, "unknown-model")["note"]
+    
+    def test_batch_clamps_cached_tokens(self):
+        """Test batch costs clamp cached tokens to input tokens like calculate_cost."""
+        batch = calculate_costs_batch([100], [50], cached_tokens=[500])
+        single = calculate_cost(100, 50, cached_tokens=500)
+        assert batch["cached_tokens"] == single["cached_tokens"] == 100
+        assert batch["per_request_usd"] == pytest.approx([single["estimated_cost_usd"]])
+
+
+class TestNVDCache:
+    """Test on-disk NVD cache."""
+    
+    def test_miss_then_hit(self, tmp_path):
+        """Test stored responses are returned for the same software."""
+        cache = NVDCache(cache_dir=str(tmp_path))
+        assert cache.get("Tiles") is None
+        
+        cache.set("Tiles", {"cves": [], "total_results": 0})
+        
+        assert cache.get("  tiles ") == {"cves": [], "total_results": 0}
+        assert cache.hits == 1
+        assert cache.misses == 1
+    
+    def test_expired_entry_is_miss(self, tmp_path):
+        """Test entries older than the TTL are ignored."""
+        cache = NVDCache(cache_dir=str(tmp_path), ttl_seconds=0)
+        cache.set("Tiles", {"cves": []})
+        
+        assert cache.get("Tiles") is None
+    
+    def test_corrupt_entry_is_miss(self, tmp_path):
+        """Test unreadable entries are treated as misses."""
+        cache = NVDCache(cache_dir=str(tmp_path))
+        cache.set("Tiles", {"cves": []})
+        next(tmp_path.glob("*.json")).write_text("{broken")
+        
+        assert cache.get("Tiles") is None